@@ -0,0 +1,101 @@
+"""Hot-path latency before and after archiving closed incidents.
+
+Most of the reporter's incidents are old and closed, as on a long-running
+installation. The same requests are timed with everything in the incident
+table, then again after archive_incidents moved the closed ones out. The
+aggregate behind the list ETag, run on every list request before any page is
+read, is timed on its own.
+Run with: python -m benchmarks.archive [rows] [repeat]
+"""
+import statistics
+import sys
+import time
+from datetime import timedelta
+from io import StringIO
+
+from benchmarks.utils import benchmark_database, create_reporter, percentile, report, setup_django
+
+
+def latencies(client, path, params, repeat):
+    from django.core.cache import cache
+
+    samples = []
+    for _ in range(repeat):
+        # Time the database work, not the incident cache.
+        cache.clear()
+        start = time.perf_counter()
+        response = client.get(path, params)
+        samples.append((time.perf_counter() - start) * 1000)
+        # The search endpoint answers 201.
+        if response.status_code not in (200, 201):
+            sys.exit(f"GET {path} {params} returned {response.status_code}.")
+    return samples
+
+
+def summary_latencies(reporter, repeat):
+    from incident.archive import incident_querysets, summarize
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        summarize(incident_querysets(reporter, {}))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main(rows=200_000, repeat=50):
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from incident.models import ArchivedIncident, Incident
+
+    with benchmark_database():
+        reporter = create_reporter()
+        now = timezone.now()
+        batch = 10_000
+        # 95% closed a year ago, the rest open and recent.
+        for offset in range(0, rows, batch):
+            Incident.objects.bulk_create([
+                Incident(reporter=reporter, incident_id=f'A{number}', organization_type='Enterprise', priority='High',
+                         incident_details='Synthetic incident details ' * 4,
+                         status='Closed' if number % 20 else 'Open',
+                         reported_at=now - timedelta(days=365, seconds=rows - number) if number % 20 else now - timedelta(seconds=rows - number))
+                for number in range(offset, min(offset + batch, rows))
+            ])
+        Incident.objects.filter(status='Closed').update(updated_at=now - timedelta(days=365))
+        open_incident = Incident.objects.filter(status='Open').order_by('-id').first()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        client = APIClient()
+        client.force_authenticate(reporter)
+        scenarios = [
+            ('list, first page', '/api/incident/', {}),
+            ('list, status=Open', '/api/incident/', {'status': 'Open'}),
+            ('detail of an open incident', f'/api/incidents/{open_incident.pk}/', {}),
+            ('search by incident_id', '/api/incidents/search/', {'incident_id': open_incident.incident_id}),
+        ]
+        before = {name: latencies(client, path, params, repeat) for name, path, params in scenarios}
+        before['list ETag summary'] = summary_latencies(reporter, repeat)
+        call_command('archive_incidents', '--batch-size', '5000', stdout=StringIO())
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        after = {name: latencies(client, path, params, repeat) for name, path, params in scenarios}
+        after['list ETag summary'] = summary_latencies(reporter, repeat)
+
+        results = [
+            (name, f"p50 {statistics.median(before[name]):7.2f} -> {statistics.median(after[name]):7.2f} ms"
+                   f"   p95 {percentile(before[name], 0.95):7.2f} -> {percentile(after[name], 0.95):7.2f} ms")
+            for name in before
+        ]
+        results.append(('hot / archived rows', f"{Incident.objects.count()} / {ArchivedIncident.objects.count()}"))
+
+    report(f"{rows} incidents (95% closed a year ago), {repeat} requests per scenario, before -> after archiving", results)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
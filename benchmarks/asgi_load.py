@@ -0,0 +1,60 @@
+"""Sync (DRF) versus async incident views under ASGI at high concurrency.
+
+Drives the ASGI application in-process and reports requests/sec and latency
+percentiles for the same read paths on both stacks.
+Run with: python -m benchmarks.asgi_load [requests] [concurrency]
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks.utils import asgi_request, benchmark_database, create_reporter, percentile, report, setup_django
+
+
+async def run_load(app, path, headers, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            status, _, _ = await asgi_request(app, 'GET', path, headers)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start), latencies, errors
+
+
+def main(requests=2000, concurrency=200):
+    setup_django()
+    from django.core.asgi import get_asgi_application
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from incident.models import Incident
+
+    with benchmark_database():
+        reporter = create_reporter()
+        incidents = Incident.objects.bulk_create([
+            Incident(reporter=reporter, organization_type='Enterprise', priority='High',
+                     incident_id=f'B{i}', incident_details=f'Synthetic incident {i}')
+            for i in range(500)
+        ])
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(reporter).access_token}'}
+        app = get_asgi_application()
+
+        rows = []
+        for name, path in [('list', 'incident/?page_size=20'), ('detail', f'incidents/{incidents[0].pk}/')]:
+            for stack, prefix in [('sync', '/api/'), ('async', '/api/async/')]:
+                rps, latencies, errors = asyncio.run(run_load(app, prefix + path, headers, requests, concurrency))
+                rows.append((f"{name} {stack}", f"{rps:8.0f} req/s  p50 {percentile(latencies, 0.5) * 1000:7.1f} ms"
+                                                 f"  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  errors {errors}"))
+
+    report(f"{requests} requests at concurrency {concurrency}", rows)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
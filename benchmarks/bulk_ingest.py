@@ -0,0 +1,41 @@
+"""N single POSTs to api/incident/ versus one POST to api/incidents/bulk/.
+
+Run with: python -m benchmarks.bulk_ingest [N]
+"""
+import sys
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, report, setup_django
+
+
+def main(count=500):
+    setup_django()
+    from rest_framework.test import APIClient
+    from incident.models import Incident
+
+    item = {'organization_type': 'Enterprise', 'incident_details': 'Synthetic alert', 'priority': 'High'}
+    with benchmark_database():
+        client = APIClient()
+        client.force_authenticate(create_reporter())
+
+        start = time.perf_counter()
+        for _ in range(count):
+            assert client.post('/api/incident/', item, format='json').status_code == 201
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert client.post('/api/incidents/bulk/', [item] * count, format='json').status_code == 201
+        bulk_seconds = time.perf_counter() - start
+        assert Incident.objects.count() == count * 2
+
+    report(f"Ingesting {count} incidents", [
+        ("single posts: seconds", f"{single_seconds:.3f}"),
+        ("single posts: incidents/s", f"{count / single_seconds:.0f}"),
+        ("bulk post: seconds", f"{bulk_seconds:.3f}"),
+        ("bulk post: incidents/s", f"{count / bulk_seconds:.0f}"),
+        ("speedup", f"{single_seconds / bulk_seconds:.1f}x"),
+    ])
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
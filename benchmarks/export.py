@@ -0,0 +1,96 @@
+"""Streaming export versus building the whole serialized list in memory.
+
+Reports time-to-first-byte, total time and peak RSS growth. The streaming
+exports run first because peak RSS only ever grows within a process. They are
+read through the WSGI test client and through the ASGI application, where a
+stream that isn't async would be buffered whole before the first byte is sent.
+Run with: python -m benchmarks.export [rows]   (default 1,000,000)
+"""
+import asyncio
+import resource
+import sys
+import time
+
+from benchmarks.utils import asgi_request, benchmark_database, create_reporter, report, setup_django
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def format_result(ttfb, total, size, baseline):
+    return f"ttfb {ttfb * 1000:7.1f} ms  total {total:6.1f} s  {size / 1e6:7.1f} MB  peak RSS +{peak_rss_mb() - baseline:6.1f} MB"
+
+
+# Reads an export through the ASGI application, counting the body instead of
+# keeping it. Returns (time to first byte, total time, size).
+async def asgi_export(app, path, headers):
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+
+    def on_body(chunk):
+        nonlocal first_byte, size
+        if chunk and first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+
+    status, _, _ = await asgi_request(app, 'GET', path, headers, on_body=on_body)
+    if status != 200:
+        sys.exit(f"GET {path} returned {status}.")
+    return first_byte, time.perf_counter() - start, size
+
+
+def main(rows=1_000_000):
+    setup_django()
+    from django.core.asgi import get_asgi_application
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from incident.models import Incident
+    from incident.serializers import ViewIncidentSerializer
+
+    with benchmark_database():
+        reporter = create_reporter()
+        batch = 10_000
+        for offset in range(0, rows, batch):
+            Incident.objects.bulk_create([
+                Incident(reporter=reporter, organization_type='Enterprise', priority='Low',
+                         incident_id=f'B{offset + i}', incident_details='Synthetic incident details ' * 8)
+                for i in range(min(batch, rows - offset))
+            ])
+        client = APIClient()
+        client.force_authenticate(reporter)
+
+        results = []
+        for output in ('csv', 'ndjson'):
+            baseline = peak_rss_mb()
+            start = time.perf_counter()
+            response = client.get('/api/incidents/export/', {'output': output})
+            content = iter(response.streaming_content)
+            size = len(next(content))
+            ttfb = time.perf_counter() - start
+            for chunk in content:
+                size += len(chunk)
+            total = time.perf_counter() - start
+            results.append((f"export {output}, WSGI", format_result(ttfb, total, size, baseline)))
+
+        app = get_asgi_application()
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(reporter).access_token}'}
+        for output in ('csv', 'ndjson'):
+            baseline = peak_rss_mb()
+            ttfb, total, size = asyncio.run(asgi_export(app, f'/api/incidents/export/?output={output}', headers))
+            results.append((f"export {output}, ASGI", format_result(ttfb, total, size, baseline)))
+
+        # What the list endpoint did before pagination: serialize everything, then render.
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        body = JSONRenderer().render(ViewIncidentSerializer(Incident.objects.filter(reporter=reporter), many=True).data)
+        total = time.perf_counter() - start
+        results.append(("in-memory serializer", format_result(total, total, len(body), baseline)))
+
+    report(f"Exporting {rows} incidents", results)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
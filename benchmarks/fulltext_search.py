@@ -0,0 +1,58 @@
+"""Full-text search (FTS5 / tsvector) versus icontains over incident_details.
+
+Run with: python -m benchmarks.fulltext_search [rows]   (default 1,000,000)
+"""
+import random
+import sys
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, report, setup_django
+
+WORDS = ('server database network outage disk latency replica timeout firewall login certificate '
+         'memory cpu queue backup deploy rollback dns cache storage printer email vpn switch').split()
+# Every incident also mentions one of many host names, so queries can target
+# rare terms the way operators do ("which incidents mention db-4711?").
+HOSTS = 50_000
+QUERIES = ['host4711', 'host123 replica', 'host99999']
+REPEAT = 5
+
+
+def main(rows=1_000_000):
+    setup_django()
+    from incident.models import Incident
+    from incident.search import search_incidents
+
+    rng = random.Random(42)
+    with benchmark_database():
+        reporter = create_reporter()
+        start = time.perf_counter()
+        batch = 10_000
+        for offset in range(0, rows, batch):
+            Incident.objects.bulk_create([
+                Incident(reporter=reporter, organization_type='Enterprise', priority='Low',
+                         incident_id=f'B{offset + i}', incident_details=' '.join(rng.choices(WORDS, k=12) + [f'host{rng.randrange(HOSTS)}']))
+                for i in range(min(batch, rows - offset))
+            ])
+        load_seconds = time.perf_counter() - start
+
+        results = []
+        for text in QUERIES:
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                search_incidents(reporter, text, limit=100)
+            fts_ms = (time.perf_counter() - start) / REPEAT * 1000
+
+            queryset = Incident.objects.filter(reporter=reporter)
+            for word in text.split():
+                queryset = queryset.filter(incident_details__icontains=word)
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                list(queryset.order_by('-reported_at')[:100])
+            icontains_ms = (time.perf_counter() - start) / REPEAT * 1000
+            results.append((f"'{text}': full-text / icontains ms", f"{fts_ms:.1f} / {icontains_ms:.1f}"))
+
+    report(f"Search over {rows} incidents (loaded in {load_seconds:.1f}s)", results)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,74 @@
+"""Incident id allocation at 90% fill of a year's RMG#####YYYY space.
+
+Compares the old random probe loop with the block allocator.
+Run with: python -m benchmarks.incident_ids
+"""
+import random
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, report, setup_django
+
+ALLOCATIONS = 500
+
+
+def legacy_generate_incident_id(Incident, year, probes):
+    random_number = random.randint(10000, 99999)
+    incident_id = f'RMG{random_number}{year}'
+    probes[0] += 1
+    while Incident.objects.filter(incident_id=incident_id).exists():
+        random_number = random.randint(10000, 99999)
+        incident_id = f'RMG{random_number}{year}'
+        probes[0] += 1
+    return incident_id
+
+
+def fill(Incident, reporter, year, numbers):
+    Incident.objects.bulk_create([
+        Incident(reporter=reporter, organization_type='Enterprise', incident_details='bench',
+                 priority='Low', incident_id=f'RMG{number}{year}')
+        for number in numbers
+    ], batch_size=2000)
+
+
+def main():
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from incident.incident_ids import INCIDENT_ID_MAX, INCIDENT_ID_MIN, IncidentIdAllocator
+    from incident.models import Incident, IncidentIdSequence
+
+    space = INCIDENT_ID_MAX - INCIDENT_ID_MIN + 1
+    filled = int(space * 0.9)
+    with benchmark_database():
+        reporter = create_reporter()
+
+        # Old scheme: 90% of the space taken by randomly scattered ids.
+        legacy_year = 2001
+        fill(Incident, reporter, legacy_year, random.sample(range(INCIDENT_ID_MIN, INCIDENT_ID_MAX + 1), filled))
+        probes = [0]
+        start = time.perf_counter()
+        for _ in range(ALLOCATIONS):
+            legacy_generate_incident_id(Incident, legacy_year, probes)
+        legacy_seconds = time.perf_counter() - start
+
+        # New scheme: 90% of the space handed out by the sequence.
+        year = 2002
+        fill(Incident, reporter, year, range(INCIDENT_ID_MIN, INCIDENT_ID_MIN + filled))
+        IncidentIdSequence.objects.create(year=year, next_value=INCIDENT_ID_MIN + filled)
+        allocator = IncidentIdAllocator()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(ALLOCATIONS):
+                allocator.allocate(year=year)
+            block_seconds = time.perf_counter() - start
+
+    report(f"{ALLOCATIONS} allocations at 90% fill ({filled} of {space} ids used)", [
+        ("random probe: queries/id", f"{probes[0] / ALLOCATIONS:.2f}"),
+        ("random probe: us/id", f"{legacy_seconds / ALLOCATIONS * 1e6:.1f}"),
+        ("block allocator: queries/id", f"{len(queries) / ALLOCATIONS:.2f}"),
+        ("block allocator: us/id", f"{block_seconds / ALLOCATIONS * 1e6:.1f}"),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Queries and latency per authenticated request: JWTAuthentication versus
+CachedJWTAuthentication on the (cached) incident detail endpoint.
+
+Run with: python -m benchmarks.jwt_auth [requests]
+"""
+import sys
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, report, setup_django
+
+
+def main(requests=2000):
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from incident.authentication import CachedJWTAuthentication, user_cache
+    from incident.models import Incident
+    from incident.views import IncidentView
+
+    with benchmark_database():
+        reporter = create_reporter()
+        incident = Incident.objects.create(reporter=reporter, organization_type='Enterprise',
+                                           priority='High', incident_details='Synthetic incident')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(reporter).access_token}')
+        url = f'/api/incidents/{incident.pk}/'
+
+        rows = []
+        for authentication in (JWTAuthentication, CachedJWTAuthentication):
+            IncidentView.authentication_classes = [authentication]
+            user_cache.clear()
+            client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for _ in range(requests):
+                    client.get(url)
+                seconds = time.perf_counter() - start
+            rows.append((authentication.__name__, f"{len(queries) / requests:.2f} queries/request, "
+                                                  f"{seconds / requests * 1e6:.0f} us/request"))
+
+    report(f"{requests} authenticated GET {url}", rows)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
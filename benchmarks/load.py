@@ -0,0 +1,308 @@
+"""End-to-end load: every route in incident/urls.py driven in-process through
+the WSGI (test client) or ASGI application at a given concurrency, against a
+dataset generated by the seed_incidents code.
+
+Reports, per route, throughput, p50/p95/p99 latency, SQL queries per request
+(from the Server-Timing header, so queries made while a streamed body is sent
+are not counted) and status codes, as JSON. Requests are made as the reporter
+with the most incidents. Throttling is disabled, the point is what a request
+costs, not how often it is allowed. The SSE event stream is skipped, it has no
+end to time.
+Run with: python -m benchmarks.load [--interface wsgi|asgi|both] [--concurrency N]
+          [--requests N] [--users N] [--incidents N] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from benchmarks.utils import asgi_request, benchmark_database, create_reporter, percentile, report, setup_django
+
+SKIPPED = {'api/incidents/events/': "server-sent event stream, open until the client disconnects"}
+QUERIES = re.compile(r'"(\d+) queries"')
+
+
+# One scenario per route and method: (route, method, expected statuses, request)
+# where request(context, n) returns the path, JSON body and headers of the n-th request.
+def scenarios():
+    def incident(n):
+        return {'organization_type': 'Enterprise', 'priority': 'Medium', 'incident_details': f'Load test incident {n}'}
+
+    def register(context, n):
+        email = f"load-{context['interface']}-{n}@example.com"
+        return '/api/register/', {
+            'first_name': 'Load', 'last_name': 'Test', 'email': email, 'password': 'Secret#123', 'confirm_password': 'Secret#123',
+            'profile': {'user_type': 'Individual', 'address': '1 MG Road', 'country': 'India', 'state': 'Karnataka',
+                        'city': 'Bengaluru', 'pincode': '560001', 'isd_code': '+91', 'mobile_number': f'98{n % 10 ** 8:08d}'},
+        }, {}
+
+    def login(context, n):
+        return '/api/login/', {'email': context['emails'][n % len(context['emails'])], 'password': context['password']}, {}
+
+    def detail(prefix):
+        return lambda context, n: (f"{prefix}incidents/{context['ids'][n % len(context['ids'])]}/", None, context['auth'])
+
+    def edit(prefix):
+        def request(context, n):
+            pk = context['open_ids'][n % len(context['open_ids'])]
+            return f'{prefix}incidents/{pk}/', {'priority': ('High', 'Medium', 'Low')[n % 3]}, context['auth']
+        return request
+
+    def search(prefix):
+        def request(context, n):
+            if n % 2:
+                return f"{prefix}incidents/search/?q=server", None, context['auth']
+            return f"{prefix}incidents/search/?incident_id={context['incident_ids'][n % len(context['incident_ids'])]}", None, context['auth']
+        return request
+
+    def reset_password(context, n):
+        from django.contrib.auth.models import User
+        from django.contrib.auth.tokens import default_token_generator
+        from django.utils.encoding import force_bytes
+        from django.utils.http import urlsafe_base64_encode
+
+        # Reset tokens die with the password they reset, make a fresh one per request.
+        user = User.objects.get(pk=context['reset_ids'][n % len(context['reset_ids'])])
+        query = f'uid={urlsafe_base64_encode(force_bytes(user.pk))}&token={default_token_generator.make_token(user)}'
+        return f'/reset-password/?{query}', {'new_password': f'Reset#{n}pass', 'confirm_password': f'Reset#{n}pass'}, {}
+
+    return [
+        ('api/register/', 'POST', {201}, register),
+        ('api/login/', 'POST', {200}, login),
+        ('api/incident/', 'GET', {200}, lambda context, n: ('/api/incident/?page_size=20', None, context['auth'])),
+        ('api/incident/', 'POST', {201}, lambda context, n: ('/api/incident/', incident(n), context['auth'])),
+        ('api/incidents/<int:pk>/', 'GET', {200}, detail('/api/')),
+        ('api/incidents/<int:pk>/', 'PUT', {201, 409}, edit('/api/')),
+        ('api/incidents/bulk/', 'POST', {201},
+         lambda context, n: ('/api/incidents/bulk/', [incident(n * 100 + i) for i in range(100)], context['auth'])),
+        ('api/incidents/export/', 'GET', {200}, lambda context, n: ('/api/incidents/export/?output=csv', None, context['auth'])),
+        ('api/incidents/search/', 'GET', {200, 201}, search('/api/')),
+        ('api/incidents/stats/', 'GET', {200}, lambda context, n: ('/api/incidents/stats/', None, context['auth'])),
+        ('api/incidents/cache/stats/', 'GET', {200}, lambda context, n: ('/api/incidents/cache/stats/', None, context['admin'])),
+        ('api/async/login/', 'POST', {200}, lambda context, n: ('/api/async/login/',) + login(context, n)[1:]),
+        ('api/async/incident/', 'GET', {200}, lambda context, n: ('/api/async/incident/?page_size=20', None, context['auth'])),
+        ('api/async/incident/', 'POST', {201}, lambda context, n: ('/api/async/incident/', incident(n), context['auth'])),
+        ('api/async/incidents/<int:pk>/', 'GET', {200}, detail('/api/async/')),
+        ('api/async/incidents/<int:pk>/', 'PUT', {201, 409}, edit('/api/async/')),
+        ('api/async/incidents/search/', 'GET', {200, 201}, search('/api/async/')),
+        ('api/pincode/<str:code>/', 'GET', {200}, lambda context, n: ('/api/pincode/560001/', None, {})),
+        ('metrics/', 'GET', {200}, lambda context, n: ('/metrics/', None, {})),
+        ('forgot-password/', 'POST', {200},
+         lambda context, n: ('/forgot-password/', {'email': context['emails'][n % len(context['emails'])]}, {})),
+        ('reset-password/', 'POST', {200}, reset_password),
+    ]
+
+
+# Fails when a route has neither a scenario nor a reason to skip it, so new
+# routes can't silently drop out of the benchmark.
+def check_coverage(scenario_list):
+    from incident.urls import urlpatterns
+
+    covered = {route for route, *_ in scenario_list} | set(SKIPPED)
+    missing = [str(pattern.pattern) for pattern in urlpatterns if str(pattern.pattern) not in covered]
+    if missing:
+        sys.exit(f"No load scenario for: {', '.join(missing)}")
+
+
+def seed(users, incidents):
+    from django.contrib.auth.models import User
+    from django.db.models import Count
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from incident.models import Incident
+    from incident.seed import SEED_PASSWORD, seed_incidents, seed_users
+
+    start = time.perf_counter()
+    rng = random.Random(1)
+    user_ids = seed_users(users, rng=rng)
+    seed_incidents(incidents, user_ids, rng=rng)
+    seeded = time.perf_counter() - start
+
+    reporter_id = (Incident.objects.values('reporter').annotate(count=Count('id'))
+                   .order_by('-count').values_list('reporter', flat=True).first())
+    reporter = User.objects.get(pk=reporter_id)
+    incidents_of_reporter = Incident.objects.filter(reporter=reporter)
+    admin = create_reporter('load-admin@example.com')
+    admin.is_staff = True
+    admin.save(update_fields=['is_staff'])
+    context = {
+        'auth': {'Authorization': f'Bearer {RefreshToken.for_user(reporter).access_token}'},
+        'admin': {'Authorization': f'Bearer {RefreshToken.for_user(admin).access_token}'},
+        'ids': list(incidents_of_reporter.values_list('pk', flat=True)[:1000]),
+        'open_ids': list(incidents_of_reporter.exclude(status='Closed').values_list('pk', flat=True)[:1000]),
+        'incident_ids': list(incidents_of_reporter.values_list('incident_id', flat=True)[:1000]),
+        'emails': list(User.objects.filter(pk__in=user_ids[:1000]).values_list('email', flat=True)),
+        'password': SEED_PASSWORD,
+        # Their passwords are changed by the reset scenario.
+        'reset_ids': seed_users(256, prefix='reset'),
+    }
+    dataset = {'users': users, 'incidents': incidents, 'seed_seconds': round(seeded, 2),
+               'reporter_incidents': incidents_of_reporter.count()}
+    return context, dataset
+
+
+def measure(latencies, queries, statuses, elapsed, expected, count):
+    errors = sum(number for code, number in statuses.items() if code not in expected)
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 1),
+        'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 2)
+                       for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries, default=None),
+        'statuses': {str(code): number for code, number in sorted(statuses.items())},
+        'errors': errors,
+    }
+
+
+def query_count(timing):
+    match = QUERIES.search(timing or '')
+    return int(match.group(1)) if match else None
+
+
+# `count` requests from `concurrency` threads, each with its own test client
+# (the full WSGI handler and middleware stack) and database connection.
+def run_wsgi(method, make_request, context, count, concurrency):
+    from django.db import connection
+    from django.test import Client
+
+    numbers = iter(range(count))
+    lock = threading.Lock()
+    latencies, queries, statuses = [], [], Counter()
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                with lock:
+                    n = next(numbers, None)
+                if n is None:
+                    return
+                path, body, headers = make_request(context, n)
+                start = time.perf_counter()
+                response = client.generic(method, path, json.dumps(body) if body is not None else '',
+                                          content_type='application/json', headers=headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] += 1
+                    if query_count(response.get('Server-Timing')) is not None:
+                        queries.append(query_count(response.get('Server-Timing')))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, queries, statuses, time.perf_counter() - start
+
+
+# `count` requests through the ASGI application, at most `concurrency` in flight.
+async def run_asgi(app, method, make_request, context, count, concurrency):
+    from asgiref.sync import sync_to_async
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, queries, statuses = [], [], Counter()
+
+    async def one(n):
+        async with semaphore:
+            path, body, headers = await sync_to_async(make_request)(context, n)
+            body = json.dumps(body).encode() if body is not None else b''
+            start = time.perf_counter()
+            status, response_headers, _ = await asgi_request(
+                app, method, path, dict(headers, **{'Content-Type': 'application/json'}), body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            timing = {name.lower(): value for name, value in response_headers}.get(b'server-timing', b'').decode()
+            if query_count(timing) is not None:
+                queries.append(query_count(timing))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(count)))
+    return latencies, queries, statuses, time.perf_counter() - start
+
+
+def build_pincode_index(directory):
+    from incident.pincodes import build_index
+    from incident.seed import LOCATIONS
+
+    path = os.path.join(directory, 'pincodes.idx')
+    build_index([(code, city, state, 'India') for code, city, state in LOCATIONS], path)
+    return path
+
+
+def main(interface='wsgi', concurrency=8, requests=200, users=1000, incidents=50000, output=None):
+    setup_django()
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.db import connection
+    from django.test import override_settings
+
+    scenario_list = scenarios()
+    check_coverage(scenario_list)
+    interfaces = ['wsgi', 'asgi'] if interface == 'both' else [interface]
+
+    with ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        overrides = {
+            'REST_FRAMEWORK': dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={}),
+            'PERF_METRICS_ENDPOINT': True,
+            'PINCODE_INDEX_PATH': build_pincode_index(directory),
+        }
+        if connection.vendor == 'sqlite':
+            # Concurrent writers need a database file in performance mode (WAL, writers wait for each other).
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'load.sqlite3')
+            connection.settings_dict['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+            overrides['SQLITE_PERFORMANCE_MODE'] = True
+        stack.enter_context(override_settings(**overrides))
+        stack.enter_context(benchmark_database())
+
+        context, dataset = seed(users, incidents)
+        results = {'concurrency': concurrency, 'requests_per_route': requests, 'dataset': dataset, 'runs': {},
+                   'skipped': [{'route': route, 'reason': reason} for route, reason in SKIPPED.items()]}
+        app = get_asgi_application()
+        for name in interfaces:
+            context['interface'] = name
+            rows = []
+            for route, method, expected, make_request in scenario_list:
+                if name == 'wsgi':
+                    measured = run_wsgi(method, make_request, context, requests, concurrency)
+                else:
+                    measured = asyncio.run(run_asgi(app, method, make_request, context, requests, concurrency))
+                rows.append(dict(route=route, method=method, **measure(*measured, expected, requests)))
+            results['runs'][name] = rows
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+        for name, rows in results['runs'].items():
+            report(f"{name.upper()}, {requests} requests per route at concurrency {concurrency} (JSON in {output})", [
+                (f"{row['method']} {row['route']}",
+                 f"{row['throughput_rps']:8.1f} req/s  p50 {row['latency_ms']['p50']:7.1f} ms  p99 {row['latency_ms']['p99']:7.1f} ms"
+                 f"  {row['queries_per_request']} queries  {row['errors']} errors")
+                for row in rows])
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--interface', choices=['wsgi', 'asgi', 'both'], default='wsgi')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="Requests per route.")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--incidents', type=int, default=50000)
+    parser.add_argument('--output', help="Write the JSON results to this file and print a summary.")
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""Incident endpoint latency while login requests flood the same process.
+
+Scenarios: inline hashing, hashing on the process pool, and pool plus the
+login rate limits. Run with: python -m benchmarks.login_flood [seconds] [flood_threads]
+"""
+import sys
+import threading
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, percentile, report, setup_django
+
+
+def run_scenario(seconds, flood_threads, url, token, email):
+    from django.test import Client
+
+    stop = threading.Event()
+    logins = {'ok': 0, 'throttled': 0}
+    latencies = []
+
+    def flood():
+        client = Client()
+        while not stop.is_set():
+            status = client.post('/api/login/', {'email': email, 'password': 'Secret#123'}).status_code
+            logins['ok' if status == 200 else 'throttled'] += 1
+
+    def probe():
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get(url)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=flood) for _ in range(flood_threads)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return (f"incident p50 {percentile(latencies, 0.5) * 1000:6.1f} ms  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+            f"  logins ok {logins['ok']} throttled {logins['throttled']}")
+
+
+def main(seconds=5, flood_threads=8):
+    setup_django()
+    from django.conf import settings
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from incident.models import Incident
+    from incident.throttling import bucket_store
+
+    unlimited = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+    with benchmark_database():
+        reporter = create_reporter()
+        reporter.set_password('Secret#123')
+        reporter.save()
+        incident = Incident.objects.create(reporter=reporter, organization_type='Enterprise',
+                                           priority='High', incident_details='Synthetic incident')
+        token = str(RefreshToken.for_user(reporter).access_token)
+        url = f'/api/incidents/{incident.pk}/'
+
+        rows = []
+        for name, overrides in [
+            ('inline hashing', {'PASSWORD_HASHING_POOL_SIZE': 0, 'REST_FRAMEWORK': unlimited}),
+            ('hashing pool', {'PASSWORD_HASHING_POOL_SIZE': 2, 'REST_FRAMEWORK': unlimited}),
+            ('hashing pool + rate limits', {'PASSWORD_HASHING_POOL_SIZE': 2}),
+        ]:
+            bucket_store.clear()
+            with override_settings(**overrides):
+                rows.append((name, run_scenario(seconds, flood_threads, url, token, reporter.email)))
+
+    report(f"{flood_threads} login threads for {seconds}s each", rows)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,107 @@
+"""Pincode lookups: build time, lookups per second and memory per worker of the
+memory-mapped index, against loading the CSV into a dict in every worker.
+
+Uses a synthetic national dataset shaped like the India Post directory
+(~155k post offices sharing ~19k pincodes) unless a CSV path is given.
+Memory is the private memory a worker adds after touching every entry, the
+mapped index pages are shared through the page cache.
+Run with: python -m benchmarks.pincodes [workers] [csv_path]
+"""
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import BASE_DIR, report
+
+CHILD = """
+import csv, json, sys
+sys.path.insert(0, {base!r})
+from incident.pincodes import PincodeIndex
+
+def private_mb():
+    with open('/proc/self/smaps_rollup') as file:
+        fields = dict(line.split(':', 1) for line in file if ':' in line)
+    return sum(int(fields[name].split()[0]) for name in ('Private_Clean', 'Private_Dirty')) / 1024
+
+before = private_mb()
+codes = {codes!r}
+if {mode!r} == 'mmap index':
+    index = PincodeIndex({index!r})
+    found = sum(index.lookup(code) is not None for code in codes)
+else:
+    with open({source!r}, newline='') as file:
+        table = {{}}
+        for row in csv.DictReader(file):
+            table.setdefault(row['pincode'], {{'city': row['Districtname'], 'state': row['statename'], 'country': 'India'}})
+    found = sum(code in table for code in codes)
+print(json.dumps({{'private_mb': private_mb() - before, 'found': found}}))
+"""
+
+
+def synthetic_dataset(path, offices=155_000, seed=1):
+    rng = random.Random(seed)
+    states = [f'State {number}' for number in range(36)]
+    districts = [(f'District {number}', rng.choice(states)) for number in range(750)]
+    pincodes = rng.sample(range(110_001, 855_118), 19_300)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['officename', 'pincode', 'Districtname', 'statename'])
+        for number in range(offices):
+            district, state = districts[pincodes[number % len(pincodes)] % len(districts)]
+            writer.writerow([f'Office {number} S.O', pincodes[number % len(pincodes)], district, state])
+
+
+def main(workers=4, source=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'incident_management_system.settings')
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from incident.pincodes import PincodeIndex
+
+    with tempfile.TemporaryDirectory() as directory:
+        if source is None:
+            source = os.path.join(directory, 'pincodes.csv')
+            synthetic_dataset(source)
+        index_path = os.path.join(directory, 'pincodes.idx')
+
+        start = time.perf_counter()
+        call_command('build_pincode_index', source, '--output', index_path, stdout=open(os.devnull, 'w'))
+        build = time.perf_counter() - start
+
+        index = PincodeIndex(index_path)
+        with open(source, newline='') as file:
+            codes = sorted({row['pincode'] for row in csv.DictReader(file)})
+        rng = random.Random(2)
+        queries = [rng.choice(codes) if rng.random() < 0.9 else f'{rng.randrange(100000, 999999)}' for _ in range(200_000)]
+        start = time.perf_counter()
+        for code in queries:
+            index.lookup(code)
+        rate = len(queries) / (time.perf_counter() - start)
+
+        rows = [
+            ('dataset', f"{sum(1 for _ in open(source)) - 1} rows, {len(codes)} pincodes, {os.path.getsize(source) / 2 ** 20:.1f} MB CSV"),
+            ('index build', f"{build:.2f} s, {os.path.getsize(index_path) / 2 ** 20:.2f} MB on disk"),
+            ('lookups', f"{rate:,.0f} /s (90% hits)"),
+        ]
+        if os.path.exists('/proc/self/smaps_rollup'):
+            for mode in ('mmap index', 'dict per worker'):
+                code = CHILD.format(base=str(BASE_DIR), codes=codes, mode=mode, index=index_path, source=source)
+                results = [
+                    json.loads(subprocess.run([sys.executable, '-'], input=code, capture_output=True, text=True, check=True).stdout)
+                    for _ in range(workers)
+                ]
+                private = sorted(result['private_mb'] for result in results)[len(results) // 2]
+                rows.append((f"memory, {mode}", f"+{private:5.2f} MB private per worker, {workers} workers ({results[0]['found']} found)"))
+        index.close()
+
+    report("Offline pincode index", rows)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]))
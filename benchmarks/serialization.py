@@ -0,0 +1,60 @@
+"""Incident read serialization: ViewIncidentSerializer + JSONRenderer vs
+IncidentValuesSerializer + FastJSONRenderer, in rows per second.
+
+Every scenario also checks that both paths render byte for byte the same JSON.
+Run with: python -m benchmarks.serialization [rows] [repeat]
+"""
+import sys
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, report, setup_django
+
+
+def rate(rows, repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return rows / best
+
+
+def main(rows=5000, repeat=5):
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from incident.incident_ids import incident_id_allocator
+    from incident.models import Incident
+    from incident.renderers import FastJSONRenderer, orjson
+    from incident.serializers import IncidentValuesSerializer, ViewIncidentSerializer
+
+    with benchmark_database():
+        reporter = create_reporter()
+        Incident.objects.bulk_create([
+            Incident(reporter=reporter, incident_id=incident_id, organization_type='Enterprise', priority='High',
+                     incident_details=f'Synthetic incident {number} – pump station offline')
+            for number, incident_id in enumerate(incident_id_allocator.allocate_many(rows))
+        ], batch_size=500)
+        queryset = Incident.objects.filter(reporter=reporter).order_by('-reported_at', '-id')
+
+        def current(fields=None):
+            return JSONRenderer().render(ViewIncidentSerializer(list(queryset.all()), many=True, fields=fields).data)
+
+        def fast(fields=None):
+            page = list(queryset.values(*IncidentValuesSerializer.columns(fields)))
+            return FastJSONRenderer().render(IncidentValuesSerializer(page, many=True, fields=fields).data)
+
+        results = []
+        for name, fields in [('all fields', None), ('fields=incident_id,status', ['incident_id', 'status'])]:
+            if current(fields) != fast(fields):
+                sys.exit(f"Output differs for {name}.")
+            before = rate(rows, repeat, lambda: current(fields))
+            after = rate(rows, repeat, lambda: fast(fields))
+            results.append((name, f"{before:10.0f} -> {after:10.0f} rows/s  ({after / before:.1f}x, identical output)"))
+
+    renderer = 'orjson' if orjson else 'stdlib json fallback'
+    report(f"{rows} incidents, best of {repeat}, renderer: {renderer}", results)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""Concurrent incident writes and reads on SQLite, default mode vs performance mode.
+
+Each mode runs on a fresh database file (WAL needs a file, and stays enabled on
+it once set). Run with: python -m benchmarks.sqlite_concurrency [seconds] [writers] [readers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import benchmark_database, create_reporter, report, setup_django
+
+
+def run_threads(seconds, writers, readers, reporter):
+    from django.db import OperationalError, connection
+    from incident.models import Incident
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def write():
+        try:
+            while not stop.is_set():
+                try:
+                    Incident.objects.create(reporter=reporter, organization_type='Enterprise', priority='High',
+                                            incident_details='Concurrent write')
+                    count('writes')
+                except OperationalError:
+                    count('locked')
+        finally:
+            connection.close()
+
+    def read():
+        try:
+            while not stop.is_set():
+                try:
+                    list(Incident.objects.filter(reporter=reporter).order_by('-reported_at', '-id')[:50])
+                    count('reads')
+                except OperationalError:
+                    count('locked')
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=write) for _ in range(writers)] + [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def run_mode(enabled, seconds, writers, readers):
+    from django.db import connection
+    from django.test import override_settings
+
+    with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_PERFORMANCE_MODE=enabled):
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        connection.settings_dict['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'} if enabled else {}
+        with benchmark_database():
+            counts = run_threads(seconds, writers, readers, create_reporter())
+    return (f"{counts['writes'] / seconds:8.1f} writes/s  {counts['reads'] / seconds:8.1f} reads/s"
+            f"  {counts['locked']} 'database is locked' errors")
+
+
+def main(seconds=5, writers=4, readers=4):
+    setup_django()
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        sys.exit("This benchmark needs the SQLite database profile (unset DB_NAME).")
+    rows = [
+        ('default', run_mode(False, seconds, writers, readers)),
+        ('performance mode', run_mode(True, seconds, writers, readers)),
+    ]
+    report(f"{writers} writer and {readers} reader threads for {seconds}s each", rows)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""Cold start of a worker: wall time and resident memory of fresh interpreters running
+`manage.py check` and booting the WSGI application (URLconf included, as on
+the first request).
+
+Every run is a new process. The last row is what importing phonenumbers, which
+is now deferred to the first registration, would add to each boot.
+Run with: python -m benchmarks.startup [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.utils import BASE_DIR, report
+
+PRELUDE = "import json, os, resource, sys, time\n"
+# Resident memory once booted (Linux), the peak elsewhere.
+RESULT = (
+    "try:\n"
+    "    rss = int(open('/proc/self/statm').read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20\n"
+    "except OSError:\n"
+    "    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+    "print(json.dumps({'rss': rss, 'phonenumbers': 'phonenumbers' in sys.modules}))\n"
+)
+
+SCENARIOS = {
+    'manage.py check': (
+        "import runpy\n"
+        "sys.argv = ['manage.py', 'check']\n"
+        "runpy.run_path('manage.py', run_name='__main__')\n"
+    ),
+    'WSGI boot': (
+        "from incident_management_system.wsgi import application\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    'import phonenumbers': (
+        "start = time.perf_counter()\n"
+        "import phonenumbers\n"
+        "print(json.dumps({'import_ms': (time.perf_counter() - start) * 1000}))\n"
+    ),
+}
+
+
+def run(code):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='incident_management_system.settings')
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', PRELUDE + code + RESULT], cwd=BASE_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.startswith('{')]
+    return dict(lines[0], **lines[-1], wall_ms=elapsed)
+
+
+def main(runs=10):
+    rows = []
+    baseline = None
+    for name, code in SCENARIOS.items():
+        samples = [run(code) for _ in range(runs)]
+        wall = statistics.median(sample['wall_ms'] for sample in samples)
+        rss = statistics.median(sample['rss'] for sample in samples)
+        if name == 'import phonenumbers':
+            imported = statistics.median(sample['import_ms'] for sample in samples)
+            rows.append((f"{name} (deferred)", f"+{imported:6.1f} ms import  +{rss - empty_rss():5.1f} MB RSS over a bare interpreter"))
+            continue
+        loaded = 'loaded' if any(sample['phonenumbers'] for sample in samples) else 'not loaded'
+        rows.append((name, f"{wall:7.1f} ms  {rss:6.1f} MB RSS  (phonenumbers {loaded})"))
+    report(f"Fresh worker processes, median of {runs}", rows)
+
+
+def empty_rss():
+    return statistics.median(run('')['rss'] for _ in range(3))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
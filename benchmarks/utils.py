@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Configure Django so a benchmark can be run as `python -m benchmarks.<name>`.
+def setup_django():
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'incident_management_system.settings')
+    import django
+    django.setup()
+    # Contention under load is expected here, keep the output readable.
+    logging.getLogger('incident.slow_queries').disabled = True
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+
+
+# Run the benchmark against a throwaway test database, never db.sqlite3.
+@contextmanager
+def benchmark_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_reporter(email='bench@example.com'):
+    from django.contrib.auth.models import User
+    user, _ = User.objects.get_or_create(username=email, defaults={'email': email})
+    return user
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def report(title, rows):
+    print(title)
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"  {name.ljust(width)}  {value}")
+
+
+# Minimal in-process ASGI client: sends one HTTP request through `app` and
+# returns (status, headers, body) without any network in between. With
+# `on_body`, every body chunk is passed to it instead and the body returned is empty.
+async def asgi_request(app, method, path, headers=None, body=b'', on_body=None):
+    path, _, query_string = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'headers': [(b'host', b'testserver')] + [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+                   + ([(b'content-length', str(len(body)).encode())] if body else []),
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    finished = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # Only disconnect once the response is complete, like a real client.
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    response = {'body': b''}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = message.get('headers', [])
+        elif message['type'] == 'http.response.body':
+            if on_body is None:
+                response['body'] += message.get('body', b'')
+            else:
+                on_body(message.get('body', b''))
+            if not message.get('more_body', False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
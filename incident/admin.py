@@ -1,9 +1,58 @@
 from django.contrib import admin
 from .models import *
+from .pagination import EstimatedCountPaginator
 
-# Register your models here.
-admin.site.register(Profile)
-admin.site.register(Incident)
+
+# Sized for millions of rows: the related user is joined into the changelist
+# query, filters hit indexed columns, and only an estimated count is shown.
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'user_type', 'country', 'state', 'city')
+    list_select_related = ('user',)
+    list_filter = ('user_type',)
+    search_fields = ('=user__username', '=user__email')
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Incident)
+class IncidentAdmin(admin.ModelAdmin):
+    list_display = ('incident_id', 'reporter', 'organization_type', 'priority', 'status', 'reported_at')
+    list_select_related = ('reporter',)
+    list_filter = ('status', 'priority', 'organization_type')
+    search_fields = ('=incident_id',)
+    ordering = ('-reported_at', '-id')
+    raw_id_fields = ('reporter',)
+    readonly_fields = ('incident_id', 'version', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['close_incidents', 'set_priority_high', 'set_priority_medium', 'set_priority_low']
+
+    # "Delete selected incidents" and the other bulk deletes bypass Incident.delete().
+    def delete_queryset(self, request, queryset):
+        Incident.delete_many(queryset)
+
+    # The actions change the selected open incidents in bulk, closed ones are left as they are.
+    def update_open(self, request, queryset, changes):
+        count = Incident.update_open(queryset, changes)
+        self.message_user(request, f"{count} incident(s) updated.")
+
+    @admin.action(description="Close selected incidents")
+    def close_incidents(self, request, queryset):
+        self.update_open(request, queryset, {'status': 'Closed'})
+
+    @admin.action(description="Set priority of selected incidents to High")
+    def set_priority_high(self, request, queryset):
+        self.update_open(request, queryset, {'priority': 'High'})
+
+    @admin.action(description="Set priority of selected incidents to Medium")
+    def set_priority_medium(self, request, queryset):
+        self.update_open(request, queryset, {'priority': 'Medium'})
+
+    @admin.action(description="Set priority of selected incidents to Low")
+    def set_priority_low(self, request, queryset):
+        self.update_open(request, queryset, {'priority': 'Low'})
 
 
 admin.site.register(Publisher)
@@ -11,6 +60,3 @@ admin.site.register(Author)
 admin.site.register(Book)
 admin.site.register(Department)
 admin.site.register(Employee)
-
-
-
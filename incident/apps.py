@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+# Schema objects the ORM can't express for this app (it ships no migrations).
+def create_database_objects(sender, using='default', **kwargs):
+    from django.db import connections
+    from .schema import ensure_user_email_index
+    from .search import ensure_search_index
+    ensure_user_email_index(connections[using])
+    ensure_search_index(connections[using])
 
 
 class IncidentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'incident'
+
+    def ready(self):
+        post_migrate.connect(create_database_objects, sender=self)
+
+        from .middleware import install_query_recorder
+        from .sqlite import configure_sqlite
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .filters import filter_incidents
+from .models import ArchivedIncident, Incident
+from .sqlite import atomic_write
+
+# Columns copied from Incident into ArchivedIncident.
+ARCHIVED_COLUMNS = [field.attname for field in Incident._meta.concrete_fields]
+
+
+def archive_cutoff(older_than_days=None):
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'INCIDENT_ARCHIVE_AFTER_DAYS', 90)
+    return timezone.now() - timedelta(days=older_than_days)
+
+
+# Move up to `batch_size` incidents closed (last updated) before `cutoff` to the
+# archive, returns how many were moved. Every batch is its own transaction, so
+# an interrupted run loses nothing and the next one continues where it stopped.
+# Cached copies and the statistics stay valid, the incidents don't change.
+def archive_batch(cutoff, batch_size):
+    with atomic_write():
+        rows = list(Incident.objects.filter(status='Closed', updated_at__lt=cutoff)
+                    .order_by('pk').select_for_update().values(*ARCHIVED_COLUMNS)[:batch_size])
+        if not rows:
+            return 0
+        archived_at = timezone.now()
+        ArchivedIncident.objects.bulk_create([ArchivedIncident(archived_at=archived_at, **row) for row in rows])
+        Incident.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archivable_count(cutoff):
+    return Incident.objects.filter(status='Closed', updated_at__lt=cutoff).count()
+
+
+# Unified lookup of a single incident as a values() row, hot table first.
+def find_incident(columns, **lookup):
+    row = Incident.objects.filter(**lookup).values(*columns).first()
+    if row is None:
+        row = ArchivedIncident.objects.filter(**lookup).values(*columns).first()
+    return row
+
+
+async def afind_incident(columns, **lookup):
+    row = await Incident.objects.filter(**lookup).values(*columns).afirst()
+    if row is None:
+        row = await ArchivedIncident.objects.filter(**lookup).values(*columns).afirst()
+    return row
+
+
+# The reporter's incidents matching the list filters, as one queryset per table.
+# The archive only holds closed incidents, so it is left out when the status
+# filter excludes them. Raises ValueError on bad input.
+def incident_querysets(reporter, params):
+    querysets = [filter_incidents(Incident.objects.filter(reporter=reporter), params)]
+    statuses = [item.strip() for item in params.get('status', '').split(',') if item.strip()]
+    if not statuses or 'Closed' in statuses:
+        querysets.append(filter_incidents(ArchivedIncident.objects.filter(reporter=reporter), params))
+    return querysets
+
+
+# Row count and newest updated_at over the querysets, for the list ETag. One
+# grouped row per table (the querysets are a single reporter's), in one query.
+def summary_queryset(querysets):
+    first, *others = [
+        # COUNT(*) rather than COUNT(id): the archive's bigint id isn't SQLite's
+        # rowid, counting it would read every row instead of just the index.
+        queryset.order_by().values('reporter').annotate(count=Count('*'), last_modified=Max('updated_at'))
+        for queryset in querysets
+    ]
+    return first.union(*others, all=True) if others else first
+
+
+def summarize(querysets):
+    return combine_summaries(list(summary_queryset(querysets)))
+
+
+async def asummarize(querysets):
+    return combine_summaries([row async for row in summary_queryset(querysets)])
+
+
+def combine_summaries(rows):
+    modified = [row['last_modified'] for row in rows if row['last_modified'] is not None]
+    return {'count': sum(row['count'] for row in rows), 'last_modified': max(modified, default=None)}
@@ -0,0 +1,272 @@
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import aauthenticate_jwt
+from .cache import incident_cache
+from .events import event_stream, get_broker
+from .conditional import if_match_satisfied, is_not_modified, make_etag, set_validators
+from .archive import afind_incident, asummarize, incident_querysets
+from .models import ArchivedIncident, Incident
+from .pagination import IncidentCursorPaginator
+from .routers import read_from_replica
+from .search import search_incidents
+from .throttling import LoginEmailThrottle, LoginIPThrottle
+from .serializers import EditIncidentSerializer, IncidentSerializer, IncidentValuesSerializer, LoginSerializer, ViewIncidentSerializer
+from .views import INCIDENT_FIELDS, get_requested_fields, incident_validators
+
+# Async (ASGI) variants of the incident and login APIs. They answer with the
+# same payloads as the DRF views in views.py, but run on the event loop and
+# use Django's async ORM instead of occupying a thread per request.
+
+
+async def aload_incident(**lookup):
+    row = await afind_incident(IncidentValuesSerializer.columns(), **lookup)
+    return IncidentValuesSerializer(row).data if row is not None else None
+
+
+def not_modified(etag, last_modified):
+    return set_validators(HttpResponseNotModified(), etag, last_modified)
+
+
+# Base class handling CSRF exemption (like DRF's APIView), JSON bodies and JWT authentication.
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    authentication_required = True
+    # Like ReplicaReadMixin, serve GET/HEAD from a read replica when enabled.
+    replica_reads = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.replica_reads and request.method in ('GET', 'HEAD'):
+            with read_from_replica():
+                return await self.handle(request, *args, **kwargs)
+        return await self.handle(request, *args, **kwargs)
+
+    async def handle(self, request, *args, **kwargs):
+        if self.authentication_required:
+            try:
+                user = await aauthenticate_jwt(request)
+            except AuthenticationFailed as e:
+                return JsonResponse({"detail": str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+            if user is None:
+                return JsonResponse({"detail": "Authentication credentials were not provided."},
+                                    status=status.HTTP_401_UNAUTHORIZED)
+            request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+    def get_data(self, request):
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+
+
+# Async api for create/update/View the Incident
+class AsyncIncidentView(AsyncAPIView):
+    replica_reads = True
+
+    async def get(self, request, pk=None, *args, **kwargs):
+        if pk:
+            data = await incident_cache.aget_by_pk(request.user.pk, pk, lambda: aload_incident(pk=pk, reporter=request.user))
+            if data is None:
+                return JsonResponse({"error": "Incident not found or you do not have permission to view this incident."},
+                                    status=status.HTTP_404_NOT_FOUND)
+            etag, last_modified = incident_validators(data)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(etag, last_modified)
+            return set_validators(JsonResponse({
+                'message': 'Successfully Fetched',
+                "status_code": 200,
+                "data": data
+            }, status=status.HTTP_200_OK), etag, last_modified)
+
+        fields = get_requested_fields(request.GET)
+        if fields is None:
+            return JsonResponse({"error": "Invalid fields requested. Allowed fields: " + ", ".join(INCIDENT_FIELDS) + "."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            querysets = incident_querysets(request.user, request.GET)
+            paginator = IncidentCursorPaginator(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = await asummarize(querysets)
+        etag = make_etag(request.user.pk, summary['count'], summary['last_modified'], request.get_full_path())
+        if is_not_modified(request, etag, summary['last_modified']):
+            return not_modified(etag, summary['last_modified'])
+
+        try:
+            columns = IncidentValuesSerializer.columns(fields or None)
+            page = await paginator.apaginate_querysets([queryset.values(*columns) for queryset in querysets])
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = IncidentValuesSerializer(page, many=True, fields=fields or None)
+        return set_validators(JsonResponse({
+            'message': 'Successfully Fetched',
+            "status_code": 200,
+            "data": serializer.data,
+            "next_cursor": paginator.next_cursor,
+        }, status=status.HTTP_200_OK), etag, summary['last_modified'])
+
+    async def post(self, request, *args, **kwargs):
+        data = self.get_data(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = IncidentSerializer(data=data, context={'request': request})
+        if serializer.is_valid():
+            await sync_to_async(serializer.save)(reporter=request.user)
+            return JsonResponse({
+                'message': 'Successfully Created',
+                "status_code": 201,
+                "data": serializer.data
+            }, status=status.HTTP_201_CREATED)
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    async def put(self, request, pk=None, *args, **kwargs):
+        try:
+            incident = await Incident.objects.aget(pk=pk, reporter=request.user)
+        except Incident.DoesNotExist:
+            if await ArchivedIncident.objects.filter(pk=pk, reporter=request.user).aexists():
+                return JsonResponse({"message": "You cannot edit a closed incident.", "status_code": 400},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"message": "Incident not found or you do not have permission to update this incident.", "status_code": 400},
+                                status=status.HTTP_404_NOT_FOUND)
+
+        etag, last_modified = incident_validators({'id': incident.pk, 'version': incident.version, 'updated_at': incident.updated_at})
+        if not if_match_satisfied(request, etag):
+            return set_validators(JsonResponse({"message": "The incident has changed since it was fetched, fetch it again before editing.", "status_code": 412},
+                                               status=status.HTTP_412_PRECONDITION_FAILED), etag, last_modified)
+
+        data = self.get_data(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = EditIncidentSerializer(incident, data=data, partial=True)
+        if serializer.is_valid():
+            if incident.status == 'Closed':
+                return JsonResponse({"message": "You cannot edit a closed incident.", "status_code": 400},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            changes = {name: value for name, value in serializer.validated_data.items() if getattr(incident, name) != value}
+            if changes and not await sync_to_async(incident.update_if_unchanged)(changes, incident.version):
+                return JsonResponse({"message": "The incident was edited or closed by another request, fetch it again before editing.", "status_code": 409},
+                                    status=status.HTTP_409_CONFLICT)
+            etag, last_modified = incident_validators({'id': incident.pk, 'version': incident.version, 'updated_at': incident.updated_at})
+            return set_validators(JsonResponse({
+                'message': 'Successfully Updated',
+                "data": serializer.data
+            }, status=status.HTTP_201_CREATED), etag, last_modified)
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Async api for searching the Incidents by incident_id or by text
+class AsyncRetrieveIncidentByIdView(AsyncAPIView):
+    replica_reads = True
+
+    async def get(self, request, *args, **kwargs):
+        if 'q' in request.GET:
+            return await self.search(request)
+
+        incident_id = request.GET.get('incident_id')
+        if not incident_id:
+            return JsonResponse({"error": "incident_id or q query parameter is required."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        data = await incident_cache.aget_by_incident_id(
+            request.user.pk, incident_id, lambda: aload_incident(incident_id=incident_id, reporter=request.user))
+        if data is None:
+            return JsonResponse({"error": "Incident not found or you do not have permission to view this incident."},
+                                status=status.HTTP_404_NOT_FOUND)
+
+        etag, last_modified = incident_validators(data)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        return set_validators(JsonResponse({
+            'message': 'Successfully item searched',
+            "data": data
+        }, status=status.HTTP_201_CREATED), etag, last_modified)
+
+    async def search(self, request):
+        text = request.GET.get('q', '').strip()
+        if not text:
+            return JsonResponse({"error": "q query parameter must not be empty."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = IncidentCursorPaginator(request).page_size
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The raw full-text queries have no async ORM equivalent.
+        incidents = await sync_to_async(search_incidents)(request.user, text, limit)
+        serializer = ViewIncidentSerializer(incidents, many=True)
+        return JsonResponse({
+            'message': 'Successfully item searched',
+            "status_code": 200,
+            "data": serializer.data
+        }, status=status.HTTP_200_OK)
+
+
+# Server-Sent Events stream of the reporter's incident changes
+# (incident.created / incident.updated), resumable with the Last-Event-ID header.
+class IncidentEventStreamView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Event streams are only served by the ASGI application."},
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return JsonResponse({"error": "Last-Event-ID must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        heartbeat = getattr(settings, 'INCIDENT_EVENT_HEARTBEAT', 15)
+        response = StreamingHttpResponse(event_stream(get_broker(), request.user.pk, last_event_id, heartbeat),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Tell nginx not to buffer the stream.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+# Async api for Login
+class AsyncLoginView(AsyncAPIView):
+    authentication_required = False
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+    async def post(self, request, *args, **kwargs):
+        data = self.get_data(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+        # Same limits as LoginAPIView, the email throttle reads request.data like on a DRF request.
+        request.data = data
+        for throttle in (throttle_class() for throttle_class in self.throttle_classes):
+            if not throttle.allow_request(request, self):
+                wait = math.ceil(throttle.wait())
+                response = JsonResponse({"detail": f"Request was throttled. Expected available in {wait} seconds."},
+                                        status=status.HTTP_429_TOO_MANY_REQUESTS)
+                response['Retry-After'] = str(wait)
+                return response
+        serializer = LoginSerializer(data=data)
+        if serializer.is_valid():
+            user = await aauthenticate(request, username=serializer.validated_data['email'],
+                                       password=serializer.validated_data['password'])
+            if user is not None:
+                refresh = RefreshToken.for_user(user)
+                return JsonResponse({
+                    'message': 'Successfully logged in',
+                    "status_code": 201,
+                    'refresh': str(refresh),
+                    'access': str(refresh.access_token),
+                }, status=status.HTTP_200_OK)
+            return JsonResponse({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+        return JsonResponse({'error': 'Invalid input', 'details': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
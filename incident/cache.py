@@ -0,0 +1,123 @@
+import itertools
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import read_from_primary
+
+
+# Read-through cache of serialized incidents, keyed by pk and by incident_id
+# and scoped to the reporter so one user can never read another's entry.
+class IncidentCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'INCIDENT_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'INCIDENT_CACHE_TIMEOUT', 60)
+
+    @staticmethod
+    def pk_key(reporter_id, pk):
+        return f'incident:{reporter_id}:pk:{pk}'
+
+    @staticmethod
+    def incident_id_key(reporter_id, incident_id):
+        return f'incident:{reporter_id}:incident_id:{incident_id}'
+
+    def get_by_pk(self, reporter_id, pk, loader):
+        return self._get_or_load(self.pk_key(reporter_id, pk), loader)
+
+    def get_by_incident_id(self, reporter_id, incident_id, loader):
+        return self._get_or_load(self.incident_id_key(reporter_id, incident_id), loader)
+
+    # `loader` returns the serialized incident, or None when there is nothing to
+    # cache (misses for unknown incidents are not stored). Misses are loaded from
+    # the primary: a row read from a lagging replica would be cached for every
+    # worker, undoing the invalidation of the write it hasn't seen yet.
+    def _get_or_load(self, key, loader):
+        data = self.cache.get(key)
+        if data is not None:
+            self._count(hit=True)
+            return data
+        self._count(hit=False)
+        with read_from_primary():
+            data = loader()
+        if data is not None:
+            self.set(data)
+        return data
+
+    async def aget_by_pk(self, reporter_id, pk, loader):
+        return await self._aget_or_load(self.pk_key(reporter_id, pk), loader)
+
+    async def aget_by_incident_id(self, reporter_id, incident_id, loader):
+        return await self._aget_or_load(self.incident_id_key(reporter_id, incident_id), loader)
+
+    # Async variant for the ASGI views, `loader` is a coroutine function.
+    async def _aget_or_load(self, key, loader):
+        data = await self.cache.aget(key)
+        if data is not None:
+            self._count(hit=True)
+            return data
+        self._count(hit=False)
+        with read_from_primary():
+            data = await loader()
+        if data is not None:
+            await self.cache.aset_many(self.entries(data), self.timeout)
+        return data
+
+    def set(self, data):
+        self.cache.set_many(self.entries(data), self.timeout)
+
+    def entries(self, data):
+        return {
+            self.pk_key(data['reporter'], data['id']): data,
+            self.incident_id_key(data['reporter'], data['incident_id']): data,
+        }
+
+    def invalidate(self, incident):
+        self.invalidate_many([(incident.reporter_id, incident.pk, incident.incident_id)])
+
+    # Drop the entries of many incidents, given as (reporter_id, pk, incident_id) rows.
+    def invalidate_many(self, rows):
+        keys = []
+        for reporter_id, pk, incident_id in rows:
+            keys += [self.pk_key(reporter_id, pk), self.incident_id_key(reporter_id, incident_id)]
+        if keys:
+            self.cache.delete_many(keys)
+
+    # Drop the entries of every incident of `queryset`, reading only the key columns, in chunks.
+    def invalidate_queryset(self, queryset, chunk_size=2000):
+        rows = queryset.order_by().values_list('reporter_id', 'pk', 'incident_id').iterator(chunk_size=chunk_size)
+        for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+            self.invalidate_many(chunk)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+incident_cache = IncidentCache()
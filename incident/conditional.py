@@ -0,0 +1,40 @@
+import hashlib
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+
+# Helpers for conditional GET (ETag / Last-Modified) on incident resources.
+
+def make_etag(*parts):
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+# True when the client's cached copy is still current, following RFC 9110:
+# If-None-Match takes precedence over If-Modified-Since.
+def is_not_modified(request, etag, last_modified=None):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since is not None and last_modified is not None:
+        return int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+# False when an If-Match header is present and names neither `etag` nor `*`,
+# i.e. the client edits a copy that is no longer current.
+def if_match_satisfied(request, etag):
+    if_match = request.META.get('HTTP_IF_MATCH')
+    if not if_match:
+        return True
+    etags = parse_etags(if_match)
+    return '*' in etags or etag in etags
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# A change of one incident, sent to its reporter's event streams as a
+# Server-Sent Event. Ids increase by one per published event.
+class IncidentEvent:
+    def __init__(self, id, reporter_id, type, data):
+        self.id = id
+        self.reporter_id = reporter_id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+# Brokers number, store and fan out the events. This one only reaches the
+# streams served by the same process and keeps the last INCIDENT_EVENT_LOG_SIZE
+# events in memory for Last-Event-ID resume. A broker for several workers
+# (e.g. Redis pub/sub with a shared sequence) implements the same methods and
+# is selected with the INCIDENT_EVENT_BROKER setting.
+class InProcessBroker:
+    def __init__(self, log_size=None):
+        self._lock = threading.Lock()
+        self._log = deque(maxlen=log_size or getattr(settings, 'INCIDENT_EVENT_LOG_SIZE', 1000))
+        self._last_id = 0
+        self._subscribers = defaultdict(set)
+
+    def publish(self, reporter_id, type, data):
+        with self._lock:
+            self._last_id += 1
+            event = IncidentEvent(self._last_id, reporter_id, type, data)
+            self._log.append(event)
+            subscribers = list(self._subscribers.get(reporter_id, ()))
+        for subscriber in subscribers:
+            subscriber(event)
+        return event
+
+    # `subscriber` is called with every event of the reporter, from the publishing thread.
+    def subscribe(self, reporter_id, subscriber):
+        with self._lock:
+            self._subscribers[reporter_id].add(subscriber)
+
+    def unsubscribe(self, reporter_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(reporter_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[reporter_id]
+
+    # The reporter's events after `last_event_id`, or None when some of them are
+    # no longer in the log (or the id is unknown) and the client has to resync.
+    def history(self, reporter_id, last_event_id):
+        with self._lock:
+            oldest = self._log[0].id if self._log else self._last_id + 1
+            if last_event_id > self._last_id or last_event_id < oldest - 1:
+                return None
+            return [event for event in self._log if event.id > last_event_id and event.reporter_id == reporter_id]
+
+    def last_event_id(self):
+        with self._lock:
+            return self._last_id
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'INCIDENT_EVENT_BROKER', 'incident.events.InProcessBroker'))()
+        return _broker
+
+
+def reset_broker(*, setting=None, **kwargs):
+    global _broker
+    if setting is None or setting.startswith('INCIDENT_EVENT_'):
+        with _broker_lock:
+            _broker = None
+
+
+setting_changed.connect(reset_broker)
+
+
+# Publish the created/updated events of `incidents` once the current transaction
+# commits, so streams never announce rows that are rolled back. The payload is
+# the API representation of the incident, taken now.
+def publish_on_commit(incidents, type):
+    from .serializers import IncidentValuesSerializer
+    payloads = [
+        (incident.reporter_id, IncidentValuesSerializer({
+            field.name: field.value_from_object(incident) for field in incident._meta.concrete_fields
+        }).data)
+        for incident in incidents
+    ]
+
+    def publish():
+        broker = get_broker()
+        for reporter_id, data in payloads:
+            broker.publish(reporter_id, type, data)
+
+    transaction.on_commit(publish)
+
+
+# Like publish_on_commit() for the incidents of `queryset`, read in chunks once
+# the transaction commits instead of being held in memory until then.
+def publish_queryset_on_commit(queryset, type, chunk_size=2000):
+    from .serializers import IncidentValuesSerializer
+
+    def publish():
+        broker = get_broker()
+        rows = queryset.order_by().values(*IncidentValuesSerializer.columns()).iterator(chunk_size=chunk_size)
+        for row in rows:
+            broker.publish(row['reporter'], type, IncidentValuesSerializer(row).data)
+
+    transaction.on_commit(publish)
+
+
+# Receives a reporter's events on the event loop of the stream serving them.
+# A client that can't keep up is disconnected once its queue is drained, and
+# resumes from the event log with Last-Event-ID.
+class EventSubscription:
+    def __init__(self, max_queue_size=None):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue_size or getattr(settings, 'INCIDENT_EVENT_QUEUE_SIZE', 100))
+        self.overflowed = False
+
+    def __call__(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.put, event)
+        except RuntimeError:
+            # The stream's event loop is already closed.
+            pass
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+# Body of an event stream: replays the log after `last_event_id`, then sends
+# live events, with a comment line every `heartbeat` seconds to keep proxies
+# from closing the idle connection.
+async def event_stream(broker, reporter_id, last_event_id, heartbeat):
+    subscription = EventSubscription()
+    # Subscribe before reading the log, events published in between arrive twice and are skipped by id.
+    broker.subscribe(reporter_id, subscription)
+    try:
+        yield f"retry: {int(heartbeat * 1000)}\n\n"
+        last_sent = last_event_id
+        if last_event_id is not None:
+            events = broker.history(reporter_id, last_event_id)
+            if events is None:
+                # Events were missed, the client reloads its incidents and continues from here.
+                last_sent = broker.last_event_id()
+                yield f"id: {last_sent}\nevent: reset\ndata: {{}}\n\n"
+                events = []
+            for event in events:
+                yield event.encode()
+                last_sent = event.id
+        while True:
+            if subscription.overflowed and subscription.queue.empty():
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if last_sent is not None and event.id <= last_sent:
+                continue
+            yield event.encode()
+            last_sent = event.id
+    finally:
+        broker.unsubscribe(reporter_id, subscription)
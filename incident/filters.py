@@ -0,0 +1,53 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Incident
+
+
+# Choice filters of the incident list, e.g. `?status=Open,In progress&priority=High`.
+CHOICE_FILTERS = {
+    'status': Incident.STATUS_CHOICES,
+    'priority': Incident.PRIORITY_CHOICES,
+    'organization_type': Incident.ORGANIZATION_CHOICES,
+}
+
+
+# Apply the list endpoint's query parameter filters, raises ValueError on bad input.
+# Every combination is served by one of the (reporter, <field>, reported_at) indexes.
+def filter_incidents(queryset, params):
+    for name, choices in CHOICE_FILTERS.items():
+        value = params.get(name)
+        if not value:
+            continue
+        values = [item.strip() for item in value.split(',') if item.strip()]
+        allowed = [choice for choice, _ in choices]
+        invalid = [item for item in values if item not in allowed]
+        if invalid:
+            raise ValueError(f"Invalid {name}: {', '.join(invalid)}. Allowed values: {', '.join(allowed)}.")
+        queryset = queryset.filter(**{name: values[0]} if len(values) == 1 else {f'{name}__in': values})
+
+    reported_after = params.get('reported_after')
+    if reported_after:
+        queryset = queryset.filter(reported_at__gte=parse_datetime_param('reported_after', reported_after))
+    reported_before = params.get('reported_before')
+    if reported_before:
+        queryset = queryset.filter(reported_at__lte=parse_datetime_param('reported_before', reported_before, end_of_day=True))
+    return queryset
+
+
+# Accepts an ISO 8601 date or datetime; a bare date covers the whole day.
+def parse_datetime_param(name, value, end_of_day=False):
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError
+            parsed = datetime.combine(date, time.max if end_of_day else time.min)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or datetime.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
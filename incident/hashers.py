@@ -0,0 +1,56 @@
+import base64
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.signals import setting_changed
+from django.utils.encoding import force_bytes
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    size = getattr(settings, 'PASSWORD_HASHING_POOL_SIZE', 0)
+    if not size:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the children only need hashlib, not a forked copy of the worker.
+            _pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def reset_hashing_pool(setting, **kwargs):
+    if setting == 'PASSWORD_HASHING_POOL_SIZE':
+        shutdown_hashing_pool()
+
+
+setting_changed.connect(reset_hashing_pool)
+
+
+# Same algorithm, parameters and encoded format as Django's PBKDF2PasswordHasher
+# (existing hashes keep working), but the PBKDF2 rounds run on a bounded process
+# pool of PASSWORD_HASHING_POOL_SIZE workers. A burst of logins or registrations
+# then queues for the pool instead of taking every CPU the request workers need.
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        args = (self.digest().name, force_bytes(password), force_bytes(salt), iterations)
+        pool = get_hashing_pool()
+        hash = pool.submit(hashlib.pbkdf2_hmac, *args).result() if pool else hashlib.pbkdf2_hmac(*args)
+        hash = base64.b64encode(hash).decode("ascii").strip()
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
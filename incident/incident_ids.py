@@ -0,0 +1,80 @@
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedIncident, Incident, IncidentIdSequence
+from .sqlite import atomic_write
+
+INCIDENT_ID_MIN = 10000
+INCIDENT_ID_MAX = 99999
+
+
+class IncidentIdSpaceExhausted(Exception):
+    pass
+
+
+def format_incident_id(number, year):
+    return f'RMG{number}{year}'
+
+
+# Hands out RMG#####YYYY ids from blocks reserved on the per-year
+# IncidentIdSequence row, so one atomic UPDATE serves a whole block of saves.
+class IncidentIdAllocator:
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'INCIDENT_ID_BLOCK_SIZE', 50)
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def allocate(self, year=None):
+        return self.allocate_many(1, year=year)[0]
+
+    def allocate_many(self, count, year=None):
+        year = year or timezone.now().year
+        with self._lock:
+            pool = self._pools.setdefault(year, deque())
+            numbers = []
+            while len(numbers) < count:
+                if pool:
+                    numbers.append(pool.popleft())
+                elif connection.in_atomic_block:
+                    # A reservation inside the caller's transaction is undone if that
+                    # transaction rolls back, so no leftovers may be kept: take exactly
+                    # what is needed.
+                    numbers.extend(self._reserve_block(year, count - len(numbers)))
+                else:
+                    pool.extend(self._reserve_block(year, max(self.block_size, count - len(numbers))))
+            return [format_incident_id(number, year) for number in numbers]
+
+    def reset(self):
+        with self._lock:
+            self._pools.clear()
+
+    def _reserve_block(self, year, size):
+        with atomic_write():
+            IncidentIdSequence.objects.get_or_create(year=year, defaults={'next_value': INCIDENT_ID_MIN})
+            # The UPDATE takes the row (or database) write lock first, so concurrent
+            # writers queue up here instead of reading the same value.
+            IncidentIdSequence.objects.filter(year=year).update(next_value=F('next_value') + size)
+            end = IncidentIdSequence.objects.values_list('next_value', flat=True).get(year=year)
+        start = end - size
+        if start > INCIDENT_ID_MAX:
+            raise IncidentIdSpaceExhausted(f"All incident ids for {year} have been used.")
+        end = min(end, INCIDENT_ID_MAX + 1)
+
+        # Skip ids already handed out by the old random generator, archived incidents included.
+        taken = set()
+        for model in (Incident, ArchivedIncident):
+            taken.update(model.objects.filter(
+                incident_id__gte=format_incident_id(start, year),
+                incident_id__lte=format_incident_id(end - 1, year),
+                incident_id__endswith=str(year),
+            ).values_list('incident_id', flat=True))
+        block = [number for number in range(start, end) if format_incident_id(number, year) not in taken]
+        return block or self._reserve_block(year, size)
+
+
+incident_id_allocator = IncidentIdAllocator()
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from incident.archive import archivable_count, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = ("Move closed incidents not updated for --older-than-days days to the archive table, in batches. "
+            "Safe to interrupt, the next run continues where it stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Defaults to the INCIDENT_ARCHIVE_AFTER_DAYS setting.")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Incidents moved per transaction, defaults to INCIDENT_ARCHIVE_BATCH_SIZE.")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to wait between batches.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the incidents that would be archived.")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['older_than_days'])
+        if options['dry_run']:
+            self.stdout.write(f"{archivable_count(cutoff)} incident(s) closed before {cutoff.isoformat()} would be archived.")
+            return
+        batch_size = options['batch_size'] or getattr(settings, 'INCIDENT_ARCHIVE_BATCH_SIZE', 1000)
+        total = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            self.stdout.write(f"Archived {total} incident(s).")
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f"Done, {total} incident(s) archived in {batches} batch(es).")
@@ -0,0 +1,66 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from incident.pincodes import build_index, reset_pincode_index
+
+# Header names tried for each column when no --*-column option is given. The
+# last ones match the India Post "all India pincode directory" CSV.
+COLUMNS = {
+    'pincode': ['pincode', 'pin', 'postal_code', 'zip'],
+    'city': ['city', 'district', 'districtname'],
+    'state': ['state', 'statename'],
+    'country': ['country'],
+}
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped pincode index used to auto-fill Profile addresses from a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--output', default=None, help="Defaults to the PINCODE_INDEX_PATH setting.")
+        parser.add_argument('--country', default='India', help="Country of rows without a country column.")
+        parser.add_argument('--encoding', default='utf-8-sig')
+        for name in COLUMNS:
+            parser.add_argument(f'--{name}-column', default=None)
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'PINCODE_INDEX_PATH', None)
+        if not output:
+            raise CommandError("Pass --output or set PINCODE_INDEX_PATH.")
+        try:
+            with open(options['csv_path'], newline='', encoding=options['encoding']) as file:
+                reader = csv.DictReader(file)
+                columns = self.find_columns(reader.fieldnames or [], options)
+                count = build_index(self.read_rows(reader, columns, options['country']), output)
+        except OSError as e:
+            raise CommandError(str(e))
+        reset_pincode_index()
+        self.stdout.write(f"Indexed {count} pincode(s) into {output}.")
+
+    # (pincode, city, state, country) of every row. DictReader fills the fields
+    # missing from a short row with None, those rows are rejected.
+    def read_rows(self, reader, columns, country):
+        for row in reader:
+            values = (row[columns['pincode']], row[columns['city']], row[columns['state']],
+                      row[columns['country']] if columns['country'] else country)
+            if None in values:
+                raise CommandError(f"Line {reader.line_num} has fewer fields than the CSV header.")
+            yield values
+
+    def find_columns(self, fieldnames, options):
+        by_name = {name.strip().lower(): name for name in fieldnames}
+        columns = {}
+        for name, candidates in COLUMNS.items():
+            given = options[f'{name}_column']
+            if given:
+                if given not in fieldnames:
+                    raise CommandError(f"Column {given!r} not found in the CSV header.")
+                columns[name] = given
+                continue
+            columns[name] = next((by_name[candidate] for candidate in candidates if candidate in by_name), None)
+            if columns[name] is None and name != 'country':
+                raise CommandError(f"No {name} column found, pass --{name}-column.")
+        return columns
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from incident.stats import check_stats_drift, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-aggregated incident statistics, or check them for drift with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report rows that differ from the incidents.")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = check_stats_drift()
+            for (reporter_id, status, priority, organization_type, day), (stored, actual) in sorted(drift.items(), key=str):
+                self.stdout.write(f"reporter={reporter_id} day={day} {status}/{priority}/{organization_type}: "
+                                  f"stored {stored}, actual {actual}")
+            if drift:
+                raise CommandError(f"{len(drift)} statistics row(s) drifted, run rebuild_incident_stats to fix them.")
+            self.stdout.write("Incident statistics are up to date.")
+            return
+        rows = rebuild_stats()
+        self.stdout.write(f"Rebuilt {rows} statistics row(s).")
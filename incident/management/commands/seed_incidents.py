@@ -0,0 +1,39 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from incident.seed import SEED_PASSWORD, seed_incidents, seed_users
+
+
+class Command(BaseCommand):
+    help = ("Bulk-generate synthetic users (with profiles) and incidents for load testing, with realistic "
+            "status/priority shares and a few reporters filing most incidents.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--incidents', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=365, help="Spread reported_at over this many days.")
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help="Zipf exponent of incidents per reporter, 0 spreads them evenly.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help="Usernames are <prefix>-<n>@example.com.")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed, for reproducible datasets.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        reporter_ids = seed_users(options['users'], prefix=options['prefix'], batch_size=options['batch_size'], rng=rng)
+        if not reporter_ids:
+            reporter_ids = list(User.objects.filter(username__startswith=f"{options['prefix']}-").values_list('pk', flat=True))
+        if options['incidents'] and not reporter_ids:
+            raise CommandError("No users to file the incidents, pass --users.")
+        self.stdout.write(f"Created {len(reporter_ids) if options['users'] else 0} user(s) with password {SEED_PASSWORD!r}.")
+
+        def progress(created):
+            self.stdout.write(f"Created {created} incident(s), {created / (time.perf_counter() - start):.0f}/s.")
+
+        seed_incidents(options['incidents'], reporter_ids, days=options['days'], skew=options['skew'],
+                       batch_size=options['batch_size'], rng=rng, progress=progress)
+        self.stdout.write(f"Done in {time.perf_counter() - start:.1f}s.")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from incident.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox, reusing one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to wait between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_outbox(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
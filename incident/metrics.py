@@ -0,0 +1,107 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Per-request measurements, filled in by the database execute wrapper and the
+# serializers' timed_serialization() blocks while PerformanceMiddleware handles a request.
+current_request_metrics = ContextVar('current_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view = None
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+# Adds the time spent in the block to the request's serializer time. Nested
+# blocks (a serializer used inside another one) are only counted once.
+@contextmanager
+def timed_serialization():
+    metrics = current_request_metrics.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_seconds += time.perf_counter() - start
+        metrics.serializing = False
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    # Prometheus text exposition format (version 0.0.4).
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: dict(value, counts=list(value['counts'])) for key, value in self._series.items()}
+        for key, value in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, value['counts']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(key, le=format_value(bound))} {cumulative}')
+            lines.append(f'{self.name}_bucket{format_labels(key, le="+Inf")} {value["count"]}')
+            lines.append(f'{self.name}_sum{format_labels(key)} {format_value(value["sum"])}')
+            lines.append(f'{self.name}_count{format_labels(key)} {value["count"]}')
+        return '\n'.join(lines)
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(key, **extra):
+    labels = list(key) + list(extra.items())
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Wall time of a request per view.', TIME_BUCKETS)
+SQL_DURATION = Histogram('http_request_sql_duration_seconds', 'Total SQL time of a request per view.', TIME_BUCKETS)
+SQL_QUERIES = Histogram('http_request_sql_queries', 'Number of SQL queries of a request per view.', (0, 1, 2, 3, 5, 10, 20, 50, 100))
+SERIALIZER_DURATION = Histogram('http_request_serializer_duration_seconds', 'Serializer time of a request per view.', TIME_BUCKETS)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Response body size per view.', (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+
+HISTOGRAMS = [REQUEST_DURATION, SQL_DURATION, SQL_QUERIES, SERIALIZER_DURATION, RESPONSE_SIZE]
+
+
+def render_metrics():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
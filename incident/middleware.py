@@ -0,0 +1,100 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import (REQUEST_DURATION, RESPONSE_SIZE, SERIALIZER_DURATION, SQL_DURATION, SQL_QUERIES,
+                      RequestMetrics, current_request_metrics)
+
+slow_query_logger = logging.getLogger('incident.slow_queries')
+
+
+# Database execute wrapper counting and timing every query of the current request.
+# It is installed on each connection when it is opened (see install_query_recorder)
+# and reads the request's metrics from a context variable, so it also sees the
+# queries that async views run through sync_to_async threads.
+def record_query(execute, sql, params, many, context):
+    metrics = current_request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics.query_count += 1
+        metrics.sql_seconds += duration
+        threshold = getattr(settings, 'PERF_SLOW_QUERY_MS', 100)
+        if threshold is not None and duration * 1000 >= threshold:
+            slow_query_logger.warning("Slow query (%.1f ms) on %s: %s", duration * 1000, metrics.view or '-', sql)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Records per-view wall time, SQL query count and time, serializer time and
+# response size. They are sent back as a Server-Timing header and collected in
+# the histograms exposed by MetricsView.
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    def record(self, request, response, metrics, duration):
+        view = self.view_label(request)
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join([
+            f'app;dur={duration * 1000:.2f}',
+            f'db;dur={metrics.sql_seconds * 1000:.2f};desc="{metrics.query_count} queries"',
+            f'ser;dur={metrics.serializer_seconds * 1000:.2f}',
+        ])
+
+        labels = {'view': view, 'method': request.method}
+        REQUEST_DURATION.observe(duration, **labels)
+        SQL_DURATION.observe(metrics.sql_seconds, **labels)
+        SQL_QUERIES.observe(metrics.query_count, **labels)
+        SERIALIZER_DURATION.observe(metrics.serializer_seconds, **labels)
+        if size is not None:
+            RESPONSE_SIZE.observe(size, **labels)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_request_metrics.get()
+        if metrics is not None:
+            metrics.view = self.view_label(request)
+
+    # Label requests by their URL route so the number of series stays bounded.
+    @staticmethod
+    def view_label(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.route if match is not None else 'unresolved'
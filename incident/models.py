@@ -1,8 +1,12 @@
+from collections import Counter, deque
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-import random
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from .cache import incident_cache
+from .sqlite import atomic_write
 
 # This is the Profile model that will save the user Profile.
 class Profile(models.Model):
@@ -13,7 +17,7 @@ class Profile(models.Model):
     ]
 
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    user_type = models.CharField(max_length=15, choices=USER_TYPE_CHOICES)
+    user_type = models.CharField(max_length=15, choices=USER_TYPE_CHOICES, db_index=True)
     address = models.TextField()
     country = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
@@ -56,28 +60,243 @@ class Incident(models.Model):
     reported_at = models.DateTimeField(default=timezone.now)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES)
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='Open')
-
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of a reporter's incidents on (reported_at, id).
+            models.Index(fields=['reporter', '-reported_at', '-id'], name='incident_reporter_cursor_idx'),
+            # Covers the count and newest updated_at of the list ETag, like archived_reporter_updated_idx.
+            models.Index(fields=['reporter', 'updated_at'], name='incident_reporter_updated_idx'),
+            # Back the status/priority/organization_type filters of the list endpoint.
+            models.Index(fields=['reporter', 'status', 'reported_at'], name='incident_reporter_status_idx'),
+            models.Index(fields=['reporter', 'priority', 'reported_at'], name='incident_reporter_priority_idx'),
+            models.Index(fields=['reporter', 'organization_type', 'reported_at'], name='incident_reporter_org_idx'),
+            # Back the admin changelist, which sorts and filters across all reporters.
+            models.Index(fields=['-reported_at', '-id'], name='incident_reported_idx'),
+            models.Index(fields=['status', '-reported_at'], name='incident_status_idx'),
+            models.Index(fields=['priority', '-reported_at'], name='incident_priority_idx'),
+            models.Index(fields=['organization_type', '-reported_at'], name='incident_org_idx'),
+        ]
+
+    def stat_key(self):
+        return (self.reporter_id, self.status, self.priority, self.organization_type, timezone.localdate(self.reported_at))
+
+    # Summary key of the row as stored, locked until the transaction ends. save()
+    # moves the count from this key, not from what the instance was loaded with,
+    # so stale instances can't decrement the wrong summary row. None if the row is gone.
+    def stored_stat_key(self):
+        row = (Incident.objects.select_for_update().filter(pk=self.pk)
+               .values_list('reporter_id', 'status', 'priority', 'organization_type', 'reported_at').first())
+        if row is None:
+            return None
+        return (*row[:4], timezone.localdate(row[4]))
 
     # To automatically save the incident_id during the creation of a new entry in the database.
     def save(self, *args, **kwargs):
+        from .events import publish_on_commit
+        from .stats import apply_stat_deltas
         if not self.incident_id:
             self.incident_id = self.generate_incident_id()
-        super().save(*args, **kwargs)
-
-    # To generate the unique [inciddent_id]
+        adding = self._state.adding
+        # Every change of an existing incident gets a new version (used for ETags).
+        if not adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
+        with atomic_write():
+            old_key = None if adding else self.stored_stat_key()
+            super().save(*args, **kwargs)
+            new_key = self.stat_key()
+            if old_key is None:
+                apply_stat_deltas({new_key: 1})
+            elif old_key != new_key:
+                apply_stat_deltas({old_key: -1, new_key: 1})
+            publish_on_commit([self], 'incident.created' if adding else 'incident.updated')
+        self.invalidate_cache()
+
+    # Write `changes` with a single conditional UPDATE that only matches while the
+    # row still has `expected_version` and is not closed, so concurrent edits can't
+    # overwrite each other. Returns False (and changes nothing) on a conflict.
+    def update_if_unchanged(self, changes, expected_version):
+        from .events import publish_on_commit
+        from .stats import apply_stat_deltas
+        old_key = self.stat_key()
+        updated_at = timezone.now()
+        with atomic_write():
+            updated = (Incident.objects.filter(pk=self.pk, version=expected_version).exclude(status='Closed')
+                       .update(version=models.F('version') + 1, updated_at=updated_at, **changes))
+            if not updated:
+                return False
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.version = expected_version + 1
+            self.updated_at = updated_at
+            new_key = self.stat_key()
+            if old_key != new_key:
+                apply_stat_deltas({old_key: -1, new_key: 1})
+            publish_on_commit([self], 'incident.updated')
+        self.invalidate_cache()
+        return True
+
+    # Apply `changes` to the incidents of `queryset` that are not closed with a
+    # single UPDATE, without loading them: the stat deltas come from one grouped
+    # query, and events and cache invalidation read the changed rows back in
+    # chunks. Returns the number of incidents changed.
+    @classmethod
+    def update_open(cls, queryset, changes):
+        from .events import publish_queryset_on_commit
+        from .stats import STAT_FIELDS, apply_stat_deltas, count_incidents
+        targets = queryset.exclude(status='Closed').order_by()
+        updated_at = timezone.now()
+        # The rows changed by this call, found again through the timestamp they get.
+        changed = cls.objects.filter(updated_at=updated_at, **changes)
+        with atomic_write():
+            connection = transaction.get_connection(targets.db)
+            if connection.features.has_select_for_update:
+                # Lock the rows so the grouped counts match what the UPDATE changes.
+                deque(targets.select_for_update().values_list('pk', flat=True).iterator(chunk_size=2000), maxlen=0)
+            deltas = Counter()
+            for key, count in count_incidents(targets).items():
+                deltas[key] -= count
+                new_key = dict(zip(STAT_FIELDS, key), **{name: value for name, value in changes.items() if name in STAT_FIELDS})
+                deltas[tuple(new_key[field] for field in STAT_FIELDS)] += count
+            count = cls.objects.filter(pk__in=targets.values('pk')).update(
+                version=models.F('version') + 1, updated_at=updated_at, **changes)
+            apply_stat_deltas(deltas)
+            incident_cache.invalidate_queryset(changed)
+            transaction.on_commit(lambda: incident_cache.invalidate_queryset(changed))
+            publish_queryset_on_commit(changed, 'incident.updated')
+        return count
+
+    def delete(self, *args, **kwargs):
+        from .stats import apply_stat_deltas
+        self.invalidate_cache()
+        key = self.stat_key()
+        with atomic_write():
+            result = super().delete(*args, **kwargs)
+            apply_stat_deltas({key: -1})
+        return result
+
+    # Delete the incidents of `queryset` in one DELETE (QuerySet.delete() skips
+    # delete() above), keeping the statistics and the cache in step. Returns the
+    # number of incidents deleted.
+    @classmethod
+    def delete_many(cls, queryset):
+        from .stats import apply_stat_deltas, count_incidents
+        with atomic_write():
+            deltas = count_incidents(queryset)
+            rows = list(queryset.order_by().values_list('reporter_id', 'pk', 'incident_id'))
+            incident_cache.invalidate_many(rows)
+            deleted = queryset.delete()[1].get(cls._meta.label, 0)
+            apply_stat_deltas({key: -count for key, count in deltas.items()})
+            transaction.on_commit(lambda: incident_cache.invalidate_many(rows))
+        return deleted
+
+    # Drop the cached copies now and again once the transaction commits, so a
+    # concurrent read cannot re-cache the old row in between.
+    def invalidate_cache(self):
+        incident_cache.invalidate(self)
+        transaction.on_commit(lambda: incident_cache.invalidate(self))
+
+    # To generate the unique [inciddent_id] from the per-year sequence
     def generate_incident_id(self):
-        current_year = timezone.now().year
-        random_number = random.randint(10000, 99999)
-        incident_id = f'RMG{random_number}{current_year}'
-        while Incident.objects.filter(incident_id=incident_id).exists():
-            random_number = random.randint(10000, 99999)
-            incident_id = f'RMG{random_number}{current_year}'
-        return incident_id
+        from .incident_ids import incident_id_allocator
+        return incident_id_allocator.allocate()
 
     def __str__(self):
         return f"Incident {self.incident_id} reported by {self.reporter}"
 
 
+# Closed incidents moved out of Incident by the archive_incidents command, so
+# the hot table and its indexes only hold incidents that are still worked on.
+# Rows keep their id and are read back through incident.archive.
+class ArchivedIncident(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    organization_type = models.CharField(max_length=15, choices=Incident.ORGANIZATION_CHOICES)
+    incident_id = models.CharField(max_length=15, unique=True)
+    reporter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_incidents')
+    incident_details = models.TextField()
+    reported_at = models.DateTimeField()
+    priority = models.CharField(max_length=10, choices=Incident.PRIORITY_CHOICES)
+    status = models.CharField(max_length=15, choices=Incident.STATUS_CHOICES)
+    updated_at = models.DateTimeField()
+    version = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Same keyset pagination as the hot table.
+            models.Index(fields=['reporter', '-reported_at', '-id'], name='archived_reporter_cursor_idx'),
+            # Covers the count and newest updated_at of the list ETag, archived rows are only counted.
+            models.Index(fields=['reporter', 'updated_at'], name='archived_reporter_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived incident {self.incident_id}"
+
+
+# Emails waiting to be delivered by the `send_outbox` command, so requests
+# never wait on the SMTP server.
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+
+# Pre-aggregated incident counts per reporter, status, priority, organization
+# type and day. Kept up to date by Incident.save/delete and the bulk paths
+# (incident/stats.py); `rebuild_incident_stats` recomputes it from scratch.
+class IncidentDailyStat(models.Model):
+    reporter = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(max_length=15, choices=Incident.STATUS_CHOICES)
+    priority = models.CharField(max_length=10, choices=Incident.PRIORITY_CHOICES)
+    organization_type = models.CharField(max_length=15, choices=Incident.ORGANIZATION_CHOICES)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reporter', 'day', 'status', 'priority', 'organization_type'],
+                                    name='incident_daily_stat_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.reporter_id} {self.day} {self.status}/{self.priority}/{self.organization_type}: {self.count}"
+
+
+# Per-year counter behind the RMG#####YYYY incident ids. Workers reserve
+# blocks of numbers from it instead of probing random ids.
+class IncidentIdSequence(models.Model):
+    year = models.PositiveIntegerField(unique=True)
+    next_value = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.year}: {self.next_value}"
+
+
 
 
 
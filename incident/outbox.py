@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .sqlite import atomic_write
+
+
+# Queue an email for the outbox worker instead of sending it inside the request.
+def queue_email(subject, body, from_email, recipient_list):
+    return OutboxEmail.objects.create(subject=subject, body=body, from_email=from_email, recipients=list(recipient_list))
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 30)
+    maximum = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), maximum))
+
+
+# Claim up to `batch_size` due emails by moving their next attempt past the
+# claim timeout, in one short transaction. Other workers skip them meanwhile,
+# and they become due again if this worker dies before recording the results.
+def claim_due_emails(batch_size):
+    now = timezone.now()
+    with atomic_write():
+        # skip_locked lets several workers drain the outbox on PostgreSQL.
+        emails = list(OutboxEmail.objects.select_for_update(skip_locked=True)
+                      .filter(status='Pending', next_attempt_at__lte=now)
+                      .order_by('next_attempt_at', 'id')[:batch_size])
+        if emails:
+            claimed_until = now + timedelta(seconds=getattr(settings, 'OUTBOX_CLAIM_SECONDS', 600))
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=claimed_until)
+    return emails
+
+
+# Send one batch of due emails over a single SMTP connection. Failures are
+# retried with exponential backoff until OUTBOX_MAX_ATTEMPTS is reached.
+# No transaction is open while talking to the SMTP server, every result is
+# its own small write, so slow sends never hold the database write lock.
+# Returns the number of (sent, failed) emails.
+def deliver_outbox(batch_size=100, connection=None):
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    emails = claim_due_emails(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # The SMTP server is unreachable, back off the whole batch.
+        for email in emails:
+            schedule_retry(email, e, max_attempts)
+        return 0, len(emails)
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                schedule_retry(email, e, max_attempts)
+                failed += 1
+            else:
+                email.status = 'Sent'
+                email.sent_at = timezone.now()
+                email.attempts += 1
+                email.save(update_fields=['status', 'sent_at', 'attempts'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def schedule_retry(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'Failed'
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
@@ -0,0 +1,124 @@
+import base64
+import heapq
+import itertools
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+# Keyset (cursor) pagination over (reported_at, id), newest first unless
+# `ordering=reported_at` is requested. The cursor is an opaque base64 token of
+# the last row's "reported_at|id", so every page is a single indexed range
+# scan instead of an OFFSET.
+class IncidentCursorPaginator:
+    orderings = {
+        '-reported_at': ('-reported_at', '-id'),
+        'reported_at': ('reported_at', 'id'),
+    }
+
+    def __init__(self, request):
+        # DRF requests expose query_params, plain (async) Django requests GET.
+        self.params = getattr(request, 'query_params', request.GET)
+        self.page_size = self.get_page_size()
+        self.ordering = self.get_ordering()
+
+    def get_ordering(self):
+        ordering = self.params.get('ordering', '-reported_at')
+        if ordering not in self.orderings:
+            raise ValueError("ordering must be one of: " + ", ".join(self.orderings) + ".")
+        return self.orderings[ordering]
+
+    def get_page_size(self):
+        default = getattr(settings, 'INCIDENT_PAGE_SIZE', 100)
+        maximum = getattr(settings, 'INCIDENT_MAX_PAGE_SIZE', 1000)
+        try:
+            page_size = int(self.params.get('page_size', default))
+        except (TypeError, ValueError):
+            raise ValueError("page_size must be an integer.")
+        if page_size < 1:
+            raise ValueError("page_size must be a positive integer.")
+        return min(page_size, maximum)
+
+    def paginate_queryset(self, queryset):
+        return self.get_page(list(self.page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset):
+        return self.get_page([row async for row in self.page_queryset(queryset)])
+
+    # Pages over querysets with the same columns (the hot and archived incidents),
+    # one range scan each, merged into a single page.
+    def paginate_querysets(self, querysets):
+        return self.get_page(self.merge_pages([list(self.page_queryset(queryset)) for queryset in querysets]))
+
+    async def apaginate_querysets(self, querysets):
+        return self.get_page(self.merge_pages([[row async for row in self.page_queryset(queryset)] for queryset in querysets]))
+
+    def merge_pages(self, pages):
+        if len(pages) == 1:
+            return pages[0]
+        rows = heapq.merge(*pages, key=cursor_position, reverse=self.ordering[0].startswith('-'))
+        return list(itertools.islice(rows, self.page_size + 1))
+
+    def page_queryset(self, queryset):
+        cursor = self.params.get('cursor')
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            reported_at, pk = decode_cursor(cursor)
+            if self.ordering[0].startswith('-'):
+                queryset = queryset.filter(Q(reported_at__lt=reported_at) | Q(reported_at=reported_at, id__lt=pk))
+            else:
+                queryset = queryset.filter(Q(reported_at__gt=reported_at) | Q(reported_at=reported_at, id__gt=pk))
+        # Fetch one extra row to know whether a next page exists.
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = None
+        if has_next:
+            self.next_cursor = encode_cursor(*cursor_position(rows[-1]))
+        return rows
+
+
+# (reported_at, id) of model instances or .values() rows.
+def cursor_position(row):
+    return (row['reported_at'], row['id']) if isinstance(row, dict) else (row.reported_at, row.pk)
+
+
+def encode_cursor(reported_at, pk):
+    raw = f"{reported_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        reported_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(reported_at), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+# Paginator for the admin changelists. On PostgreSQL the row count comes from
+# the planner's estimate (EXPLAIN) once that estimate exceeds
+# ADMIN_EXACT_COUNT_LIMIT, instead of an exact COUNT(*) over millions of rows.
+# Small results, and other databases, are still counted exactly.
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000):
+            return estimate
+        return super().count
+
+
+def estimate_count(queryset):
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,136 @@
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+# On-disk pincode index: a header, the pincodes as fixed-width sorted records
+# (key, location number), then the distinct locations as offsets into a blob of
+# "city\0state\0country" strings. The file is memory-mapped read-only, so
+# every worker shares the same page cache copy and a lookup is a binary search
+# touching a handful of pages.
+MAGIC = b'PINIDX1\0'
+HEADER = struct.Struct('<8sII')
+KEY_SIZE = 10
+RECORD = struct.Struct(f'<{KEY_SIZE}sI')
+OFFSET = struct.Struct('<I')
+
+
+def normalize_pincode(code):
+    return ''.join(str(code).split()).upper()
+
+
+def encode_key(code):
+    key = normalize_pincode(code).encode('ascii', 'ignore')
+    return key.ljust(KEY_SIZE, b'\0') if key and len(key) <= KEY_SIZE else None
+
+
+# Write the index of `rows` ((pincode, city, state, country) tuples) to `path`.
+# The first row of a pincode wins, post office lists repeat them. The file is
+# replaced atomically, workers that still map the old one keep reading it.
+# Returns the number of pincodes indexed.
+def build_index(rows, path):
+    records, locations, location_numbers = {}, [], {}
+    for code, city, state, country in rows:
+        key = encode_key(code)
+        if key is None or key in records:
+            continue
+        location = (city.strip(), state.strip(), country.strip())
+        if location not in location_numbers:
+            location_numbers[location] = len(locations)
+            locations.append(location)
+        records[key] = location_numbers[location]
+
+    blobs = ['\0'.join(location).encode() for location in locations]
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as file:
+        file.write(HEADER.pack(MAGIC, len(records), len(locations)))
+        for key in sorted(records):
+            file.write(RECORD.pack(key, records[key]))
+        offset = 0
+        for blob in blobs:
+            file.write(OFFSET.pack(offset))
+            offset += len(blob)
+        file.write(OFFSET.pack(offset))
+        file.writelines(blobs)
+    os.replace(file.name, path)
+    return len(records)
+
+
+class PincodeIndex:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, location_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a pincode index.")
+        self._records = HEADER.size
+        self._offsets = self._records + self.size * RECORD.size
+        self._blob = self._offsets + (location_count + 1) * OFFSET.size
+        self._keys = RecordKeys(self._map, self._records, self.size)
+
+    # {'pincode', 'city', 'state', 'country'}, or None for unknown pincodes.
+    def lookup(self, code):
+        key = encode_key(code)
+        if key is None:
+            return None
+        position = bisect.bisect_left(self._keys, key)
+        if position == self.size or self._keys[position] != key:
+            return None
+        _, number = RECORD.unpack_from(self._map, self._records + position * RECORD.size)
+        start, end = struct.unpack_from('<II', self._map, self._offsets + number * OFFSET.size)
+        city, state, country = self._map[self._blob + start:self._blob + end].decode().split('\0')
+        return {'pincode': normalize_pincode(code), 'city': city, 'state': state, 'country': country}
+
+    def close(self):
+        self._map.close()
+
+
+# Sequence view of the record keys for bisect, reading them straight from the map.
+class RecordKeys:
+    def __init__(self, buffer, start, size):
+        self.buffer, self.start, self.size = buffer, start, size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, position):
+        offset = self.start + position * RECORD.size
+        return self.buffer[offset:offset + KEY_SIZE]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+# The index at PINCODE_INDEX_PATH, opened once per process, or None when it
+# hasn't been built (see the build_pincode_index command).
+def get_pincode_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = getattr(settings, 'PINCODE_INDEX_PATH', None)
+            if not path or not os.path.exists(path):
+                return None
+            _index = PincodeIndex(path)
+        return _index
+
+
+def reset_pincode_index(*, setting=None, **kwargs):
+    global _index
+    if setting is None or setting == 'PINCODE_INDEX_PATH':
+        with _index_lock:
+            _index = None
+
+
+setting_changed.connect(reset_pincode_index)
+
+
+def lookup_pincode(code):
+    index = get_pincode_index()
+    return index.lookup(code) if index is not None else None
@@ -0,0 +1,54 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional, DRF's stdlib json rendering is used without it.
+    orjson = None
+
+
+# Whether `data` holds a float anywhere, keys included.
+def contains_float(data):
+    if isinstance(data, float):
+        return True
+    if isinstance(data, dict):
+        return any(isinstance(key, float) or contains_float(value) for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return any(contains_float(item) for item in data)
+    return False
+
+
+class FloatFound(Exception):
+    pass
+
+
+# JSONRenderer encoding with orjson when it is installed. The output is byte for
+# byte what JSONRenderer produces: compact separators, UTF-8 instead of \u
+# escapes, and DRF's encoder for everything orjson should not format itself
+# (datetimes, decimals, lazy strings, ...). orjson writes floats differently
+# (1e+16, 1e-05) and turns NaN into null where JSONRenderer raises ValueError,
+# so payloads with floats go through JSONRenderer, as do indented output,
+# ASCII-only output and anything orjson can't encode. The API's own payloads
+# hold no floats.
+class FastJSONRenderer(JSONRenderer):
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) or contains_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = self.encoder_class()
+
+        # DRF's encoder turns some values into floats too (Decimal without COERCE_DECIMAL_TO_STRING).
+        def default(value):
+            value = encoder.default(value)
+            if contains_float(value):
+                raise FloatFound
+            return value
+
+        try:
+            ret = orjson.dumps(data, default=default, option=self.options)
+        except TypeError:  # orjson.JSONEncodeError, raised for FloatFound too
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, escape the two characters that are valid JSON but not valid JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,57 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Set while a view that tolerates replication lag is handling a request, see read_from_replica().
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+# Reads that must see the latest commit even inside read_from_replica(), e.g.
+# rows that are about to be cached for every worker.
+@contextmanager
+def read_from_primary():
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+# Sends the reads made inside read_from_replica() to one of the
+# DATABASE_REPLICAS aliases. Everything else, and every write, stays on the
+# primary, so requests that write never read stale rows.
+class ReplicaRouter:
+    @property
+    def replicas(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    def db_for_read(self, model, **hints):
+        replicas = self.replicas
+        if replicas and replica_reads.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Objects loaded from a replica are written back to the primary.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in self.replicas:
+            return 'default'
+        return None
+
+    # Replicas hold the same rows as the primary.
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in self.replicas
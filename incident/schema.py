@@ -0,0 +1,21 @@
+import logging
+
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+USER_EMAIL_INDEX = 'auth_user_email_uniq'
+
+
+# auth.User.email has no index, but registration and password resets look users
+# up by it. Add a unique (partial, so blank emails of e.g. superusers are
+# allowed) index after migrate.
+def ensure_user_email_index(connection):
+    if 'auth_user' not in connection.introspection.table_names():
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {USER_EMAIL_INDEX} ON auth_user (email) WHERE email <> ''")
+    except DatabaseError:
+        # Existing duplicate emails have to be cleaned up before the index can be built.
+        logger.warning("Could not create the unique index on auth_user.email, are there duplicate emails?", exc_info=True)
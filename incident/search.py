@@ -0,0 +1,109 @@
+import re
+
+from django.db import connections, router
+
+from .models import ArchivedIncident, Incident
+
+FTS_TABLE = 'incident_incident_fts'
+ARCHIVE_FTS_TABLE = 'incident_archivedincident_fts'
+# Searched tables, their SQLite FTS5 index and the prefix of their trigger and
+# index names. Archived incidents keep their own index, the one of
+# incident_incident forgets them when they are moved.
+SEARCH_TABLES = [
+    (Incident, 'incident_incident', FTS_TABLE, 'incident'),
+    (ArchivedIncident, 'incident_archivedincident', ARCHIVE_FTS_TABLE, 'archivedincident'),
+]
+
+
+# SQLite: an external-content FTS5 table over incident_details, kept in sync by
+# triggers so saves, edits, bulk inserts and raw UPDATEs all update the index.
+def sqlite_setup(table, fts_table, prefix):
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+            USING fts5(incident_details, content='{table}', content_rowid='id')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table}(rowid, incident_details) VALUES (new.id, new.incident_details);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, incident_details) VALUES ('delete', old.id, old.incident_details);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_fts_update AFTER UPDATE OF incident_details ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, incident_details) VALUES ('delete', old.id, old.incident_details);
+            INSERT INTO {fts_table}(rowid, incident_details) VALUES (new.id, new.incident_details);
+        END""",
+    ]
+
+
+# PostgreSQL: a generated tsvector column (maintained by the database on every
+# write) with a GIN index.
+def postgres_setup(table, prefix):
+    return [
+        f"""ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (to_tsvector('english', coalesce(incident_details, ''))) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {prefix}_search_vector_idx ON {table} USING GIN (search_vector)",
+    ]
+
+
+# Create the full-text indexes for the current backend, called after migrate.
+def ensure_search_index(connection):
+    tables = connection.introspection.table_names()
+    with connection.cursor() as cursor:
+        for _, table, fts_table, prefix in SEARCH_TABLES:
+            if table not in tables:
+                continue
+            if connection.vendor == 'sqlite':
+                for statement in sqlite_setup(table, fts_table, prefix):
+                    cursor.execute(statement)
+                if fts_table not in tables:
+                    # Index the incidents that already exist.
+                    cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                for statement in postgres_setup(table, prefix):
+                    cursor.execute(statement)
+
+
+# Turn free text into an FTS5 query that matches all of its words, so user
+# input can never be parsed as FTS5 syntax.
+def fts5_query(text):
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+# Incidents of `reporter` matching the words of `text`, archived ones included,
+# best match first.
+def search_incidents(reporter, text, limit, using=None):
+    # Raw queries skip the database routers, pick the alias like the ORM would.
+    using = using or router.db_for_read(Incident)
+    vendor = connections[using].vendor
+    if vendor == 'sqlite' and not fts5_query(text):
+        return []
+    results = []
+    for model, table, fts_table, _ in SEARCH_TABLES:
+        results += search_table(model.objects.using(using), table, fts_table, vendor, reporter, text, limit)
+    if vendor == 'sqlite':
+        results.sort(key=lambda incident: (incident.rank, incident.id))
+    elif vendor == 'postgresql':
+        results.sort(key=lambda incident: (-incident.rank, incident.id))
+    else:
+        results.sort(key=lambda incident: incident.reported_at, reverse=True)
+    return results[:limit]
+
+
+def search_table(queryset, table, fts_table, vendor, reporter, text, limit):
+    if vendor == 'sqlite':
+        return list(queryset.raw(
+            f"""SELECT {table}.*, bm25({fts_table}) AS rank
+                FROM {fts_table} JOIN {table} ON {table}.id = {fts_table}.rowid
+                WHERE {fts_table} MATCH %s AND {table}.reporter_id = %s
+                ORDER BY rank, {table}.id LIMIT %s""",
+            [fts5_query(text), reporter.pk, limit],
+        ))
+    if vendor == 'postgresql':
+        return list(queryset.raw(
+            f"""SELECT *, ts_rank(search_vector, query) AS rank
+                FROM {table}, websearch_to_tsquery('english', %s) AS query
+                WHERE search_vector @@ query AND reporter_id = %s
+                ORDER BY rank DESC, id LIMIT %s""",
+            [text, reporter.pk, limit],
+        ))
+    # No full-text support on this backend, fall back to a substring match.
+    return list(queryset.filter(reporter=reporter, incident_details__icontains=text).order_by('-reported_at')[:limit])
@@ -0,0 +1,113 @@
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import ArchivedIncident, Incident, Profile
+from .sqlite import atomic_write
+from .stats import apply_stat_deltas, count_new_incidents
+
+# Shares of the synthetic incidents, roughly those of a long-running installation.
+STATUS_WEIGHTS = {'Open': 20, 'In progress': 15, 'Closed': 65}
+PRIORITY_WEIGHTS = {'High': 20, 'Medium': 50, 'Low': 30}
+ORGANIZATION_WEIGHTS = {'Enterprise': 70, 'Government': 30}
+USER_TYPE_WEIGHTS = {'Individual': 60, 'Enterprises': 30, 'Government': 10}
+LOCATIONS = [
+    ('560001', 'Bengaluru', 'Karnataka'),
+    ('110001', 'New Delhi', 'Delhi'),
+    ('400001', 'Mumbai', 'Maharashtra'),
+    ('600001', 'Chennai', 'Tamil Nadu'),
+    ('700001', 'Kolkata', 'West Bengal'),
+    ('682001', 'Kochi', 'Kerala'),
+    ('500001', 'Hyderabad', 'Telangana'),
+    ('411001', 'Pune', 'Maharashtra'),
+]
+DETAILS = [
+    'Server is down', 'Database replication lag', 'Login page returns 500', 'Payment gateway timeout',
+    'Disk almost full on the primary', 'Certificate expires soon', 'Email delivery delayed', 'VPN unreachable',
+]
+SEED_PASSWORD = 'Seed#1234'
+# Synthetic incidents get SEED########### ids: the RMG#####YYYY space only
+# holds 90,000 incidents a year, and these never collide with real ones.
+SEED_ID_PREFIX = 'SEED'
+
+
+def weighted(rng, weights, k):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+# Create `count` users with a Profile each, in bulk. They all get SEED_PASSWORD
+# (hashed once, hashing per user would dominate the run). Returns the new users' ids.
+def seed_users(count, prefix='seed', batch_size=5000, rng=None):
+    rng = rng or random.Random()
+    password = make_password(SEED_PASSWORD)
+    start = User.objects.filter(username__startswith=f'{prefix}-').count()
+    ids = []
+    for offset in range(0, count, batch_size):
+        numbers = range(start + offset, start + min(offset + batch_size, count))
+        users = [User(username=f'{prefix}-{number}@example.com', email=f'{prefix}-{number}@example.com',
+                      first_name=f'User {number}', password=password) for number in numbers]
+        with atomic_write():
+            User.objects.bulk_create(users, batch_size=1000)
+            # SQLite and PostgreSQL return the primary keys of bulk inserts.
+            user_types = weighted(rng, USER_TYPE_WEIGHTS, len(users))
+            Profile.objects.bulk_create([
+                Profile(user=user, user_type=user_type, address=f'{number} Main Road', country='India',
+                        state=location[2], city=location[1], pincode=location[0], isd_code='+91',
+                        mobile_number=f'98{number % 10 ** 8:08d}')
+                for user, user_type, number, location in zip(users, user_types, numbers, itertools.cycle(LOCATIONS))
+            ], batch_size=1000)
+        ids.extend(user.pk for user in users)
+    return ids
+
+
+def next_seed_number():
+    numbers = [0]
+    for model in (Incident, ArchivedIncident):
+        last = (model.objects.filter(incident_id__startswith=SEED_ID_PREFIX)
+                .order_by('-incident_id').values_list('incident_id', flat=True).first())
+        if last:
+            numbers.append(int(last[len(SEED_ID_PREFIX):]) + 1)
+    return max(numbers)
+
+
+def seed_incident_id(number):
+    return f'{SEED_ID_PREFIX}{number:011d}'
+
+
+# Create `count` incidents over the last `days` days for `reporter_ids`, in bulk
+# batches that keep the statistics in step. Reporters are picked with a Zipf
+# distribution of exponent `skew`, so a few reporters file most incidents.
+# `progress` is called with the number created so far after every batch.
+def seed_incidents(count, reporter_ids, days=365, skew=1.1, batch_size=5000, rng=None, progress=None):
+    rng = rng or random.Random()
+    reporter_ids = list(reporter_ids)
+    rng.shuffle(reporter_ids)
+    cum_weights = list(itertools.accumulate(1 / rank ** skew for rank in range(1, len(reporter_ids) + 1)))
+    now = timezone.now()
+    first_number = next_seed_number()
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        reporters = rng.choices(reporter_ids, cum_weights=cum_weights, k=size)
+        statuses = weighted(rng, STATUS_WEIGHTS, size)
+        priorities = weighted(rng, PRIORITY_WEIGHTS, size)
+        organizations = weighted(rng, ORGANIZATION_WEIGHTS, size)
+        incidents = [
+            Incident(reporter_id=reporter_id, incident_id=incident_id, status=status, priority=priority,
+                     organization_type=organization, incident_details=rng.choice(DETAILS),
+                     reported_at=now - timedelta(seconds=rng.randrange(days * 86400)))
+            for reporter_id, incident_id, status, priority, organization in zip(
+                reporters, map(seed_incident_id, range(first_number + created, first_number + created + size)),
+                statuses, priorities, organizations)
+        ]
+        with atomic_write():
+            Incident.objects.bulk_create(incidents, batch_size=1000)
+            apply_stat_deltas(count_new_incidents(incidents))
+        created += size
+        if progress is not None:
+            progress(created)
+    return created
@@ -1,9 +1,19 @@
+import functools
 from django.core.validators import RegexValidator
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, models
+from django.utils import timezone
 from .models import Profile, Incident
-import phonenumbers
+from .incident_ids import incident_id_allocator
+from .cache import incident_cache
+from .stats import apply_stat_deltas, count_new_incidents
+from .sqlite import atomic_write
+from .events import publish_on_commit
+from .export import format_datetime
+from .pincodes import lookup_pincode
+from .metrics import timed_serialization
 
 # Custom validator for password
 password_regex_validator = RegexValidator(
@@ -11,28 +21,35 @@ password_regex_validator = RegexValidator(
     message="Password must be at least 8 characters long, contain at least one uppercase letter, one special character, and one digit."
 )
 
-def validate_phone_number(potential_number: str, country_code: str) -> bool:
+# Whether `potential_number` is a valid phone number of the `isd_code` country
+# ("+91"). Numbers without their own "+<code>" prefix are read as national
+# numbers of that country. Results are cached, registrations repeat a small set
+# of shapes. phonenumbers is imported on first use instead of at boot: it is the
+# largest import of the app and only registrations need it.
+@functools.lru_cache(maxsize=4096)
+def validate_phone_number(potential_number: str, isd_code: str) -> bool:
+    import phonenumbers
+
+    country_code = isd_code.strip().lstrip('+')
+    if not potential_number.startswith('+'):
+        potential_number = f'+{country_code}{potential_number}'
     try:
-        # If the country code starts with '+', remove it for phonenumbers.parse
-        if country_code.startswith('+'):
-            country_code = country_code[1:]
-        
-        # Parse the phone number using the country code
-        phone_number_obj = phonenumbers.parse(potential_number, country_code)
-    except phonenumbers.phonenumberutil.NumberParseException as e:
+        phone_number_obj = phonenumbers.parse(potential_number, None)
+    except phonenumbers.NumberParseException:
         return False
 
-    # Check if the parsed number is valid
-    if not phonenumbers.is_valid_number(phone_number_obj):
-        return False
+    # The number must belong to the ISD code's country and be valid there.
+    return str(phone_number_obj.country_code) == country_code and phonenumbers.is_valid_number(phone_number_obj)
 
-    return True
+LOCATION_FIELDS = ['country', 'state', 'city']
 
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['user_type', 'address', 'country', 'state', 'city', 'pincode',
                   'mobile_number', 'fax', 'isd_code']
+        # Filled in from the pincode when left out, see RegistrationSerializer.validate.
+        extra_kwargs = {name: {'required': False, 'allow_blank': True} for name in LOCATION_FIELDS}
 
 class RegistrationSerializer(serializers.ModelSerializer):
     profile = ProfileSerializer()  # Nested serializer for the Profile model
@@ -59,6 +76,16 @@ class RegistrationSerializer(serializers.ModelSerializer):
         if not validate_phone_number(mobile_number, isd_code):
             raise serializers.ValidationError({"mobile_number": "Invalid mobile number."})
 
+        # Auto-fill the location fields left blank from the offline pincode index
+        profile = attrs['profile']
+        missing = [name for name in LOCATION_FIELDS if not profile.get(name)]
+        if missing:
+            location = lookup_pincode(profile['pincode'])
+            if location is None:
+                raise serializers.ValidationError({"profile": {name: "This field is required, the pincode is unknown." for name in missing}})
+            for name in missing:
+                profile[name] = location[name]
+
         return attrs
 
     def create(self, validated_data):
@@ -70,19 +97,26 @@ class RegistrationSerializer(serializers.ModelSerializer):
             email=validated_data['email'],
         )
         user.set_password(validated_data['password'])
-        user.save()
-
-        Profile.objects.create(
-            user=user,
-            user_type=profile_data['user_type'],
-            address=profile_data['address'],
-            country=profile_data['country'],
-            state=profile_data['state'],
-            city=profile_data['city'],
-            pincode=profile_data['pincode'],
-            mobile_number=profile_data['mobile_number'],
-            fax=profile_data.get('fax')
-        )
+
+        # The User and its Profile are written together or not at all.
+        try:
+            with atomic_write():
+                user.save()
+                Profile.objects.create(
+                    user=user,
+                    user_type=profile_data['user_type'],
+                    address=profile_data['address'],
+                    country=profile_data['country'],
+                    state=profile_data['state'],
+                    city=profile_data['city'],
+                    pincode=profile_data['pincode'],
+                    isd_code=profile_data['isd_code'],
+                    mobile_number=profile_data['mobile_number'],
+                    fax=profile_data.get('fax')
+                )
+        except IntegrityError:
+            # Another registration with this email won the race after validate().
+            raise serializers.ValidationError({"email": "A user with this email already exists."})
         return user
 
 class LoginSerializer(serializers.Serializer):
@@ -92,38 +126,119 @@ class LoginSerializer(serializers.Serializer):
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
-class IncidentSerializer(serializers.ModelSerializer):
+# Counts the time spent building `.data` as the request's serializer time (see
+# PerformanceMiddleware). Views only read `.data` of the outermost serializer.
+class TimedDataMixin:
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+# Creates a batch of incidents with pre-allocated ids in a single bulk INSERT.
+class BulkIncidentListSerializer(TimedDataMixin, serializers.ListSerializer):
+    def create(self, validated_data):
+        reporter = self.context['request'].user
+        incident_ids = incident_id_allocator.allocate_many(len(validated_data))
+        incidents = [
+            Incident(reporter=reporter, incident_id=incident_id, **attrs)
+            for incident_id, attrs in zip(incident_ids, validated_data)
+        ]
+        with atomic_write():
+            incidents = Incident.objects.bulk_create(incidents, batch_size=500)
+            apply_stat_deltas(count_new_incidents(incidents))
+            publish_on_commit(incidents, 'incident.created')
+        return incidents
+
+class IncidentSerializer(TimedDataMixin, serializers.ModelSerializer):
     reporter = serializers.ReadOnlyField(source='reporter.username')
 
     class Meta:
         model = Incident
         fields = ['organization_type', 'incident_id', 'reporter', 'incident_details', 'priority', 'status', 'reported_at']
         read_only_fields = ['incident_id', 'reported_at', 'reporter']
+        list_serializer_class = BulkIncidentListSerializer
         
     def create(self, validated_data):
         # Automatically set the reporter field to the currently authenticated user
         validated_data['reporter'] = self.context['request'].user
         return super().create(validated_data)
 
-class ViewIncidentSerializer(serializers.ModelSerializer):
+class ViewIncidentSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Incident
         fields = "__all__"
-
-class EditIncidentSerializer(serializers.ModelSerializer):
+        list_serializer_class = TimedListSerializer
+
+    # Optional `fields` argument to return only a subset of the columns.
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+# Read-only fast path of ViewIncidentSerializer for the incident reads. Builds
+# the same dicts (keys, order and representations) straight from .values()
+# rows, without model instances or per-field serializer objects.
+class IncidentValuesSerializer:
+    def __init__(self, rows, many=False, fields=None):
+        self.rows = rows
+        self.many = many
+        self.fields = [name for name in incident_field_order() if fields is None or name in fields]
+
+    # Columns to pass to .values(): the requested fields plus the pagination cursor.
+    @staticmethod
+    def columns(fields=None):
+        return [name for name in incident_field_order() if fields is None or name in fields or name in ('id', 'reported_at')]
+
+    @property
+    def data(self):
+        with timed_serialization():
+            format_in_current_tz = functools.partial(format_datetime, tz=timezone.get_current_timezone())
+            converters = [(name, format_in_current_tz if name in DATETIME_FIELDS else None) for name in self.fields]
+            if not self.many:
+                return self.to_representation(self.rows, converters)
+            return [self.to_representation(row, converters) for row in self.rows]
+
+    @staticmethod
+    def to_representation(row, converters):
+        return {
+            name: row[name] if convert is None or row[name] is None else convert(row[name])
+            for name, convert in converters
+        }
+
+
+# Keys of ViewIncidentSerializer in output order, looked up once.
+@functools.cache
+def incident_field_order():
+    return list(ViewIncidentSerializer().fields)
+
+
+DATETIME_FIELDS = {field.name for field in Incident._meta.concrete_fields if isinstance(field, models.DateTimeField)}
+
+class EditIncidentSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Incident
         fields = ['incident_details', 'priority', 'status']
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        incident_cache.invalidate(instance)
+        return instance
+
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
     
-    def validate_email(self, value):
+    # The user is looked up once here and handed to the view as validated_data['user'].
+    def validate(self, attrs):
         try:
-            user = User.objects.get(email=value)
+            attrs['user'] = User.objects.get(email=attrs['email'])
         except User.DoesNotExist:
-            raise serializers.ValidationError("No user is associated with this email address.")
-        return value
+            raise serializers.ValidationError({"email": "No user is associated with this email address."})
+        return attrs
 
 class ResetPasswordSerializer(serializers.Serializer):
     new_password = serializers.CharField(write_only=True, required=True, validators=[validate_password],  )
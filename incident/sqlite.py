@@ -0,0 +1,87 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+# SQLite performance mode (SQLITE_PERFORMANCE_MODE): readers no longer block the
+# writer, and writers wait for each other instead of failing with "database is locked".
+def performance_mode_enabled(connection):
+    return connection.vendor == 'sqlite' and getattr(settings, 'SQLITE_PERFORMANCE_MODE', False)
+
+
+def sqlite_pragmas():
+    return {
+        'journal_mode': 'WAL',
+        # Safe with WAL, only the last transactions can be lost on power failure.
+        'synchronous': 'NORMAL',
+        'busy_timeout': getattr(settings, 'SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': getattr(settings, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        # Negative sizes are in KiB instead of pages.
+        'cache_size': -getattr(settings, 'SQLITE_CACHE_SIZE_KB', 64 * 1024),
+        'temp_store': 'MEMORY',
+    }
+
+
+# connection_created handler applying the PRAGMAs to every new SQLite connection.
+def configure_sqlite(sender, connection, **kwargs):
+    if not performance_mode_enabled(connection):
+        return
+    for name, value in sqlite_pragmas().items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+# Process-wide FIFO queue of write transactions. SQLite has a single writer, so
+# threads of this process take turns here instead of all racing for the
+# database lock. Reentrant, nested writes of the same thread pass straight through.
+class WriteQueue:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._owner = None
+        self._depth = 0
+
+    def acquire(self):
+        thread = threading.get_ident()
+        with self._condition:
+            if self._owner == thread:
+                self._depth += 1
+                return
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._condition.wait_for(lambda: self._serving == ticket)
+            self._owner = thread
+            self._depth = 1
+
+    def release(self):
+        with self._condition:
+            self._depth -= 1
+            if not self._depth:
+                self._owner = None
+                self._serving += 1
+                self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+write_queue = WriteQueue()
+
+
+# transaction.atomic() for writes, queued behind this process's other writers
+# when the database runs in SQLite performance mode.
+@contextmanager
+def atomic_write(using=None):
+    using = using or DEFAULT_DB_ALIAS
+    if not performance_mode_enabled(connections[using]):
+        with transaction.atomic(using=using):
+            yield
+        return
+    with write_queue, transaction.atomic(using=using):
+        yield
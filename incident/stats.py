@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .filters import CHOICE_FILTERS, parse_datetime_param
+from .models import ArchivedIncident, Incident, IncidentDailyStat
+from .sqlite import atomic_write
+
+STAT_FIELDS = ['reporter_id', 'status', 'priority', 'organization_type', 'day']
+
+
+# Apply {stat_key: delta} changes to IncidentDailyStat, creating missing rows.
+# Must run in the same transaction as the incident writes they describe.
+def apply_stat_deltas(deltas):
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        lookup = dict(zip(STAT_FIELDS, key))
+        if IncidentDailyStat.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                IncidentDailyStat.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Created concurrently by another writer, the row exists now.
+            IncidentDailyStat.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+# Increments for a batch of newly created incidents (bulk_create skips save()).
+def count_new_incidents(incidents):
+    return Counter(incident.stat_key() for incident in incidents)
+
+
+# Number of incidents of `queryset` per stat key, in one grouped query.
+def count_incidents(queryset):
+    rows = (queryset
+            .annotate(day=TruncDate('reported_at', tzinfo=timezone.get_current_timezone()))
+            .values(*STAT_FIELDS)
+            .annotate(count=Count('id'))
+            .order_by())
+    return Counter({tuple(row[field] for field in STAT_FIELDS): row['count'] for row in rows})
+
+
+# Recompute the summary rows straight from the incidents, archived ones included
+# (archiving moves incidents between tables without changing the counts).
+def compute_stats():
+    counts = Counter()
+    for model in (Incident, ArchivedIncident):
+        counts.update(count_incidents(model.objects.all()))
+    return dict(counts)
+
+
+def stored_stats():
+    rows = IncidentDailyStat.objects.exclude(count=0).values(*STAT_FIELDS, 'count')
+    return {tuple(row[field] for field in STAT_FIELDS): row['count'] for row in rows}
+
+
+# Keys whose stored count differs from the incidents, as {key: (stored, actual)}.
+def check_stats_drift():
+    actual, stored = compute_stats(), stored_stats()
+    return {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in actual.keys() | stored.keys()
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+
+# The snapshot is taken in the transaction that replaces the rows, so writes
+# can't land between the two. On PostgreSQL the table lock waits for writers
+# holding deltas and holds off new ones until the rebuild commits.
+def rebuild_stats():
+    with atomic_write():
+        connection = transaction.get_connection()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {IncidentDailyStat._meta.db_table} IN EXCLUSIVE MODE')
+        actual = compute_stats()
+        IncidentDailyStat.objects.all().delete()
+        IncidentDailyStat.objects.bulk_create(
+            [IncidentDailyStat(count=count, **dict(zip(STAT_FIELDS, key))) for key, count in actual.items()],
+            batch_size=500,
+        )
+    return len(actual)
+
+
+# Counts of a reporter's incidents by status, priority and organization type,
+# optionally limited to `reported_after`/`reported_before` days. Raises ValueError on bad input.
+def incident_stats(reporter, params):
+    rows = IncidentDailyStat.objects.filter(reporter=reporter)
+    reported_after = params.get('reported_after')
+    if reported_after:
+        rows = rows.filter(day__gte=timezone.localdate(parse_datetime_param('reported_after', reported_after)))
+    reported_before = params.get('reported_before')
+    if reported_before:
+        rows = rows.filter(day__lte=timezone.localdate(parse_datetime_param('reported_before', reported_before)))
+
+    stats = {name: {choice: 0 for choice, _ in choices} for name, choices in CHOICE_FILTERS.items()}
+    stats['total'] = 0
+    # One grouped query over the summary rows, the per-field counts are summed up here.
+    for row in rows.values(*CHOICE_FILTERS).annotate(total=Sum('count')).order_by():
+        for name in CHOICE_FILTERS:
+            stats[name][row[name]] = stats[name].get(row[name], 0) + row['total']
+        stats['total'] += row['total']
+    return stats
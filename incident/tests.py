@@ -1,3 +1,1506 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .archive import incident_querysets, summary_queryset
+from .authentication import UserCache, user_cache
+from .cache import incident_cache
+from .filters import filter_incidents
+from .hashers import PooledPBKDF2PasswordHasher
+from .incident_ids import IncidentIdAllocator, IncidentIdSpaceExhausted, INCIDENT_ID_MAX, format_incident_id, incident_id_allocator
+from .metrics import RequestMetrics, current_request_metrics, reset_metrics
+from .models import ArchivedIncident, Incident, IncidentDailyStat, IncidentIdSequence, OutboxEmail, Profile
+from .outbox import claim_due_emails, deliver_outbox, queue_email
+from .pagination import IncidentCursorPaginator
+from .pincodes import PincodeIndex
+from .routers import ReplicaRouter, read_from_replica
+from .sqlite import WriteQueue
+from .renderers import FastJSONRenderer
+from .events import InProcessBroker, get_broker, reset_broker
+from .seed import SEED_PASSWORD
+from .serializers import IncidentValuesSerializer, LoginSerializer, ViewIncidentSerializer, validate_phone_number
+from .stats import check_stats_drift, rebuild_stats
+from .throttling import TokenBucketStore, bucket_store
+
+
+class IncidentTestMixin:
+    # Reset the process-wide caches and rate limit buckets between tests.
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        user_cache.clear()
+        bucket_store.clear()
+        reset_broker()
+
+    def create_user(self, email='reporter@example.com', password='Secret#123'):
+        return User.objects.create_user(username=email, email=email, password=password)
+
+    def create_incident(self, reporter, **kwargs):
+        data = {
+            'organization_type': 'Enterprise',
+            'incident_details': 'Server is down',
+            'priority': 'High',
+        }
+        data.update(kwargs)
+        return Incident.objects.create(reporter=reporter, **data)
+
+
+class IncidentListPaginationTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.incidents = [
+            self.create_incident(self.user, reported_at=now - timedelta(minutes=i))
+            for i in range(5)
+        ]
+
+    def test_pages_follow_cursor_newest_first(self):
+        response = self.client.get('/api/incident/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        ids = [row['incident_id'] for row in response.data['data']]
+        cursor = response.data['next_cursor']
+        while cursor:
+            response = self.client.get('/api/incident/', {'page_size': 2, 'cursor': cursor})
+            ids += [row['incident_id'] for row in response.data['data']]
+            cursor = response.data['next_cursor']
+        self.assertEqual(ids, [incident.incident_id for incident in self.incidents])
+
+    def test_equal_timestamps_are_not_skipped(self):
+        reported_at = timezone.now() + timedelta(hours=1)
+        for _ in range(3):
+            self.create_incident(self.user, reported_at=reported_at)
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 1}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/incident/', params)
+            seen += [row['id'] for row in response.data['data']]
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+    def test_fields_projection_skips_unrequested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/incident/', {'fields': 'incident_id,status,priority'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['data'][0]), {'incident_id', 'status', 'priority'})
+        self.assertNotIn('incident_details', queries[-1]['sql'])
+
+    def test_invalid_fields_and_cursor_are_rejected(self):
+        self.assertEqual(self.client.get('/api/incident/', {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/incident/', {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/incident/', {'page_size': 0}).status_code, 400)
+
+
+class IncidentIdAllocatorTests(IncidentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+
+    def test_incident_ids_keep_format_and_are_unique(self):
+        year = timezone.now().year
+        ids = [self.create_incident(self.user).incident_id for _ in range(5)]
+        self.assertEqual(len(set(ids)), 5)
+        for incident_id in ids:
+            self.assertRegex(incident_id, rf'^RMG\d{{5}}{year}$')
+
+    def test_allocators_in_separate_workers_get_disjoint_blocks(self):
+        first, second = IncidentIdAllocator(block_size=10), IncidentIdAllocator(block_size=10)
+        ids = first.allocate_many(15, year=2030) + second.allocate_many(15, year=2030)
+        self.assertEqual(len(set(ids)), 30)
+        self.assertEqual(IncidentIdSequence.objects.get(year=2030).next_value, 10000 + 30)
+
+    def test_ids_from_the_old_random_generator_are_skipped(self):
+        self.create_incident(self.user, incident_id='RMG100012030')
+        ids = IncidentIdAllocator(block_size=5).allocate_many(3, year=2030)
+        self.assertEqual(ids, ['RMG100002030', 'RMG100022030', 'RMG100032030'])
+
+    # TestCase wraps every test in a transaction, like the admin and ATOMIC_REQUESTS.
+    def test_ids_are_consecutive_inside_a_transaction(self):
+        year = timezone.now().year
+        incident_id_allocator.reset()
+        with transaction.atomic():
+            ids = [self.create_incident(self.user).incident_id for _ in range(3)]
+        self.assertEqual(ids, [format_incident_id(number, year) for number in range(10000, 10003)])
+        self.assertEqual(IncidentIdSequence.objects.get(year=year).next_value, 10003)
+
+    def test_exhausted_year_raises(self):
+        IncidentIdSequence.objects.create(year=2030, next_value=INCIDENT_ID_MAX)
+        allocator = IncidentIdAllocator(block_size=5)
+        self.assertEqual(allocator.allocate(year=2030), f'RMG{INCIDENT_ID_MAX}2030')
+        with self.assertRaises(IncidentIdSpaceExhausted):
+            allocator.allocate(year=2030)
+
+
+class BulkIncidentTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.item = {'organization_type': 'Enterprise', 'incident_details': 'Disk full', 'priority': 'Low'}
+
+    def test_json_array_is_created_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/incidents/bulk/', [self.item] * 20, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual(Incident.objects.filter(reporter=self.user).count(), 20)
+        self.assertEqual(len(set(response.data['data'])), 20)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "incident_incident"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_ndjson_stream(self):
+        body = '\n'.join(json.dumps(self.item) for _ in range(3)) + '\n'
+        response = self.client.post('/api/incidents/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Incident.objects.count(), 3)
+
+    def test_invalid_items_are_reported_by_index_and_nothing_is_saved(self):
+        items = [self.item, dict(self.item, priority='Urgent'), self.item]
+        response = self.client.post('/api/incidents/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertIn('priority', response.data['errors'][0]['errors'])
+        self.assertEqual(Incident.objects.count(), 0)
+
+
+class IncidentCacheTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        incident_cache.reset_stats()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.incident = self.create_incident(self.user)
+
+    def test_detail_is_served_from_cache_after_first_read(self):
+        url = f'/api/incidents/{self.incident.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['data']['incident_id'], self.incident.incident_id)
+        self.assertEqual(incident_cache.stats()['hits'], 1)
+        self.assertEqual(incident_cache.stats()['misses'], 1)
+
+    def test_search_shares_the_entry_cached_by_pk(self):
+        self.client.get(f'/api/incidents/{self.incident.pk}/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/incidents/search/', {'incident_id': self.incident.incident_id})
+        self.assertEqual(response.data['data']['id'], self.incident.pk)
+
+    def test_edit_invalidates_cached_entry(self):
+        url = f'/api/incidents/{self.incident.pk}/'
+        self.client.get(url)
+        self.client.put(url, {'priority': 'Low'}, format='json')
+        self.assertEqual(self.client.get(url).data['data']['priority'], 'Low')
+
+    def test_cache_is_scoped_to_reporter(self):
+        url = f'/api/incidents/{self.incident.pk}/'
+        self.client.get(url)
+        self.client.force_authenticate(self.create_user('other@example.com'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalGetTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.incident = self.create_incident(self.user)
+
+    def test_detail_etag_answers_304_until_incident_changes(self):
+        url = f'/api/incidents/{self.incident.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        update = self.client.put(url, {'priority': 'Low'}, format='json')
+        self.assertNotEqual(update['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_save_bumps_version(self):
+        self.incident.status = 'In progress'
+        self.incident.save(update_fields=['status'])
+        self.incident.refresh_from_db()
+        self.assertEqual(self.incident.version, 2)
+
+    def test_list_etag_changes_with_new_incident(self):
+        etag = self.client.get('/api/incident/')['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/incident/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.create_incident(self.user)
+        self.assertEqual(self.client.get('/api/incident/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/incident/')
+        last_modified = response['Last-Modified']
+        self.assertEqual(self.client.get('/api/incident/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(
+            self.client.get('/api/incident/', HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT').status_code, 200)
+
+
+class IncidentFilterTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.open_high = self.create_incident(self.user, priority='High', reported_at=now - timedelta(days=3))
+        self.closed_low = self.create_incident(self.user, priority='Low', status='Closed', reported_at=now - timedelta(days=2))
+        self.government = self.create_incident(self.user, organization_type='Government', status='In progress', reported_at=now)
+
+    def get_ids(self, **params):
+        response = self.client.get('/api/incident/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['data']]
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids(status='Closed'), [self.closed_low.pk])
+        self.assertEqual(self.get_ids(status='Open,In progress'), [self.government.pk, self.open_high.pk])
+        self.assertEqual(self.get_ids(priority='High', organization_type='Enterprise'), [self.open_high.pk])
+        reported_after = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.get_ids(reported_after=reported_after), [self.government.pk])
+        self.assertEqual(self.get_ids(reported_before=self.closed_low.reported_at.isoformat()),
+                         [self.closed_low.pk, self.open_high.pk])
+
+    def test_ascending_ordering_with_cursor(self):
+        response = self.client.get('/api/incident/', {'ordering': 'reported_at', 'page_size': 2})
+        ids = [row['id'] for row in response.data['data']]
+        response = self.client.get('/api/incident/', {'ordering': 'reported_at', 'page_size': 2, 'cursor': response.data['next_cursor']})
+        ids += [row['id'] for row in response.data['data']]
+        self.assertEqual(ids, [self.open_high.pk, self.closed_low.pk, self.government.pk])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'status': 'Done'}, {'reported_after': 'yesterday'}, {'ordering': 'priority'}):
+            self.assertEqual(self.client.get('/api/incident/', params).status_code, 400)
+
+
+# How a full table scan of incident_incident shows up in EXPLAIN output.
+FULL_SCAN_PATTERNS = {
+    'sqlite': r'SCAN incident_incident(?! USING)',
+    'postgresql': r'Seq Scan on incident_incident',
+}
+COVERING_SUMMARY_PATTERNS = {
+    'sqlite': r'(?s)COVERING INDEX incident_reporter_updated_idx.*COVERING INDEX archived_reporter_updated_idx',
+    'postgresql': r'(?s)Index Only Scan using incident_reporter_updated_idx.*Index Only Scan using archived_reporter_updated_idx',
+}
+
+
+class IncidentQueryPlanTests(IncidentTestMixin, TestCase):
+    # Every supported filter combination must be answered through an index,
+    # never by a full scan of the incident table.
+    def test_filter_combinations_use_an_index(self):
+        user = self.create_user()
+        combinations = [{}]
+        for name, value in [('status', 'Open'), ('priority', 'High'), ('organization_type', 'Government'),
+                            ('reported_after', '2024-01-01'), ('reported_before', '2024-12-31')]:
+            combinations += [dict(params, **{name: value}) for params in combinations]
+        for params in combinations:
+            for ordering in IncidentCursorPaginator.orderings.values():
+                queryset = filter_incidents(Incident.objects.filter(reporter=user), params).order_by(*ordering)
+                plan = queryset.explain()
+                with self.subTest(params=params, ordering=ordering):
+                    self.assertNotRegex(plan, FULL_SCAN_PATTERNS[connection.vendor])
+
+    # The list ETag is computed before any page is read, so it must come from
+    # the index alone instead of visiting every one of the reporter's rows.
+    def test_list_summary_is_read_from_an_index(self):
+        user = self.create_user()
+        plan = summary_queryset(incident_querysets(user, {})).explain()
+        self.assertRegex(plan, COVERING_SUMMARY_PATTERNS[connection.vendor])
+
+
+class IncidentFullTextSearchTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.database = self.create_incident(self.user, incident_details='Database replica lag on the primary database')
+        self.network = self.create_incident(self.user, incident_details='Network outage in the database datacenter')
+        self.create_incident(self.user, incident_details='Printer out of paper')
+        self.create_incident(self.create_user('other@example.com'), incident_details='Database is down')
+
+    def search(self, text):
+        response = self.client.get('/api/incidents/search/', {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['data']]
+
+    def test_results_are_ranked_and_scoped_to_reporter(self):
+        self.assertEqual(self.search('database'), [self.database.pk, self.network.pk])
+        self.assertEqual(self.search('database outage'), [self.network.pk])
+
+    def test_index_follows_edits(self):
+        self.client.put(f'/api/incidents/{self.network.pk}/', {'incident_details': 'Switch failure'}, format='json')
+        self.assertEqual(self.search('database'), [self.database.pk])
+        self.assertEqual(self.search('switch'), [self.network.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('database" OR (printer'), [])
+        self.assertEqual(self.client.get('/api/incidents/search/', {'q': ' '}).status_code, 400)
+
+
+class FailingEmailBackend(locmem.EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+class PasswordResetOutboxTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+
+    def test_forgot_password_queues_email_without_sending(self):
+        response = self.client.post('/forgot-password/', {'email': self.user.email}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.recipients, [self.user.email])
+        self.assertIn('/reset-password/?uid=', email.body)
+
+    def test_worker_delivers_batch_over_one_connection(self):
+        for _ in range(3):
+            queue_email('Subject', 'Body', 'noreply@example.com', [self.user.email])
+        with mock.patch.object(locmem.EmailBackend, 'open', autospec=True, return_value=True) as open_connection:
+            call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboxEmail.objects.filter(status='Sent').count(), 3)
+
+    # The batch is claimed before sending, so other workers skip it while this
+    # one talks to the SMTP server without holding a transaction open.
+    def test_batch_is_claimed_while_sending(self):
+        queue_email('Subject', 'Body', 'noreply@example.com', [self.user.email])
+        concurrent = []
+        original_send = locmem.EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            concurrent.append(deliver_outbox(connection=locmem.EmailBackend()))
+            return original_send(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', autospec=True, side_effect=send_messages):
+            self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(concurrent, [(0, 0)])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_claims_of_a_dead_worker_expire(self):
+        email = queue_email('Subject', 'Body', 'noreply@example.com', [self.user.email])
+        self.assertEqual(claim_due_emails(10), [email])
+        self.assertEqual(claim_due_emails(10), [])
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(), (1, 0))
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        email = queue_email('Subject', 'Body', 'noreply@example.com', [self.user.email])
+        backend = FailingEmailBackend()
+        self.assertEqual(deliver_outbox(connection=backend), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('Pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_outbox(connection=backend), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        deliver_outbox(connection=backend)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('Failed', 2))
+        self.assertIn('SMTP server unavailable', email.last_error)
+
+
+class AccountQueryCountTests(IncidentTestMixin, APITestCase):
+    registration = {
+        'first_name': 'Asha',
+        'last_name': 'Rao',
+        'email': 'asha@example.com',
+        'password': 'Secret#123',
+        'confirm_password': 'Secret#123',
+        'profile': {
+            'user_type': 'Individual',
+            'address': '1 MG Road',
+            'country': 'India',
+            'state': 'Karnataka',
+            'city': 'Bengaluru',
+            'pincode': '560001',
+            'isd_code': '+91',
+            'mobile_number': '+919876543210',
+        },
+    }
+
+    def test_registration_queries(self):
+        # email check, then user + profile inserts inside one transaction (savepoint in tests)
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/register/', self.registration, format='json')
+        self.assertEqual(response.status_code, 201)
+        profile = Profile.objects.select_related('user').get()
+        self.assertEqual((profile.user.email, profile.isd_code), ('asha@example.com', '+91'))
+
+    def test_registration_is_atomic(self):
+        with mock.patch.object(Profile.objects, 'create', side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                self.client.post('/api/register/', self.registration, format='json')
+        self.assertFalse(User.objects.filter(email='asha@example.com').exists())
+
+    def test_duplicate_email_is_rejected(self):
+        self.create_user('asha@example.com')
+        response = self.client.post('/api/register/', self.registration, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+
+    def test_forgot_password_looks_up_user_once(self):
+        user = self.create_user()
+        # user lookup + outbox insert
+        with self.assertNumQueries(2):
+            response = self.client.post('/forgot-password/', {'email': user.email}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post('/forgot-password/', {'email': 'nobody@example.com'}, format='json').status_code, 400)
+
+    def test_user_email_is_unique(self):
+        self.create_user('asha@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(username='another', email='asha@example.com')
+        # Blank emails (e.g. superusers created without one) stay allowed.
+        User.objects.create(username='admin1')
+        User.objects.create(username='admin2')
+
+
+class PhoneNumberValidationTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        validate_phone_number.cache_clear()
+
+    def test_numbers_are_checked_against_the_isd_code(self):
+        self.assertTrue(validate_phone_number('9876543210', '+91'))
+        self.assertTrue(validate_phone_number('+919876543210', '+91'))
+        self.assertTrue(validate_phone_number('2025550123', '1'))
+        self.assertFalse(validate_phone_number('+14155550123', '+91'))
+        self.assertFalse(validate_phone_number('12', '+91'))
+        self.assertFalse(validate_phone_number('9876543210', '+999'))
+
+    def test_registration_accepts_national_numbers(self):
+        registration = dict(AccountQueryCountTests.registration)
+        registration['profile'] = dict(registration['profile'], mobile_number='9876543210')
+        self.assertEqual(self.client.post('/api/register/', registration, format='json').status_code, 201)
+
+    def test_results_are_cached(self):
+        for _ in range(3):
+            validate_phone_number('9876543210', '+91')
+        self.assertEqual(validate_phone_number.cache_info().hits, 2)
+
+    # phonenumbers is only imported by the first validation, not when a worker boots.
+    def test_not_imported_at_startup(self):
+        code = ("import sys, django; django.setup(); from django.urls import get_resolver; "
+                "get_resolver().url_patterns; print('phonenumbers' in sys.modules)")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=settings.BASE_DIR,
+                                env=dict(os.environ, DJANGO_SETTINGS_MODULE='incident_management_system.settings'))
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+
+
+class PerformanceMiddlewareTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        reset_metrics()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.create_incident(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/incident/')
+        timings = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timings), {'app', 'db', 'ser'})
+        # The summary (both tables in one query) and a page scan of the hot and archived incidents.
+        self.assertIn('desc="3 queries"', timings['db'])
+
+    # Only the app's serializers are timed, DRF's own classes are left untouched.
+    def test_serializer_time_is_recorded_by_app_serializers(self):
+        incidents = list(Incident.objects.all())
+        for serializer, timed in [(ViewIncidentSerializer(incidents, many=True), True),
+                                  (ViewIncidentSerializer(incidents[0]), True),
+                                  (LoginSerializer({'email': 'a@example.com', 'password': 'x'}), False)]:
+            metrics = RequestMetrics()
+            token = current_request_metrics.set(metrics)
+            try:
+                serializer.data
+            finally:
+                current_request_metrics.reset(token)
+            self.assertEqual(metrics.serializer_seconds > 0, timed)
+
+    @override_settings(PERF_METRICS_ENDPOINT=True)
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.get('/api/incident/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="api/incident/"} 1', body)
+        self.assertIn('http_request_sql_queries_sum{method="GET",view="api/incident/"} 3', body)
+        self.assertIn('# TYPE http_response_size_bytes histogram', body)
+
+    def test_metrics_endpoint_is_opt_in(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+
+    @override_settings(PERF_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged(self):
+        with self.assertLogs('incident.slow_queries', 'WARNING') as logs:
+            self.client.get('/api/incident/')
+        self.assertIn('api/incident/', logs.output[-1])
+
+
+class AsyncIncidentViewTests(IncidentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.incident = self.create_incident(self.user, incident_details='Replica lag on the primary database')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def test_list_and_detail_match_sync_views(self):
+        sync_client = APIClient()
+        sync_client.force_authenticate(self.user)
+        for path in ['incident/', f'incidents/{self.incident.pk}/', f'incidents/search/?incident_id={self.incident.incident_id}',
+                     'incidents/search/?q=replica']:
+            response = await self.async_client.get(f'/api/async/{path}', headers=self.headers)
+            expected = await sync_to_async(sync_client.get)(f'/api/{path}')
+            with self.subTest(path=path):
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), json.loads(expected.content))
+
+    async def test_requires_valid_token(self):
+        response = await self.async_client.get('/api/async/incident/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/async/incident/', headers={'Authorization': 'Bearer broken'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_create_edit_and_conditional_get(self):
+        response = await self.async_client.post(
+            '/api/async/incident/', {'organization_type': 'Government', 'incident_details': 'Outage', 'priority': 'Low'},
+            content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        pk = await Incident.objects.values_list('pk', flat=True).aget(incident_id=response.json()['data']['incident_id'])
+
+        etag = (await self.async_client.get(f'/api/async/incidents/{pk}/', headers=self.headers))['ETag']
+        response = await self.async_client.get(f'/api/async/incidents/{pk}/', headers=dict(self.headers, If_None_Match=etag))
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.async_client.put(f'/api/async/incidents/{pk}/', {'status': 'Closed'},
+                                               content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.put(f'/api/async/incidents/{pk}/', {'priority': 'High'},
+                                               content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_login(self):
+        response = await self.async_client.post('/api/async/login/', {'email': self.user.email, 'password': 'Secret#123'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        response = await self.async_client.post('/api/async/login/', {'email': self.user.email, 'password': 'wrong'},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+
+class CachedJWTAuthenticationTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.incident = self.create_incident(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_user_is_loaded_once_per_ttl(self):
+        url = f'/api/incidents/{self.incident.pk}/'
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        # Both the user and the incident now come from the caches.
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_password_reset_invalidates_cached_user(self):
+        self.client.get('/api/incident/')
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = default_token_generator.make_token(self.user)
+        response = APIClient().post(f'/reset-password/?uid={uid}&token={token}',
+                                    {'new_password': 'N3w#Password', 'confirm_password': 'N3w#Password'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_inactive_cached_user_is_rejected_and_cache_is_bounded(self):
+        self.client.get('/api/incident/')
+        user_cache.set(User(pk=self.user.pk, username=self.user.username, is_active=False))
+        self.assertEqual(self.client.get('/api/incident/').status_code, 401)
+
+        bounded = UserCache(max_size=2, ttl=60)
+        for pk in (1, 2, 3):
+            bounded.set(User(pk=pk))
+        self.assertIsNone(bounded.get(1))
+        self.assertEqual(bounded.get(3).pk, 3)
+        expired = UserCache(ttl=-1)
+        expired.set(User(pk=3))
+        self.assertIsNone(expired.get(3))
+
+
+class PasswordHashingTests(TestCase):
+    def test_pooled_hasher_matches_stock_pbkdf2(self):
+        stock = PBKDF2PasswordHasher().encode('Secret#123', 'somesalt', iterations=1000)
+        with override_settings(PASSWORD_HASHING_POOL_SIZE=1):
+            self.assertEqual(PooledPBKDF2PasswordHasher().encode('Secret#123', 'somesalt', iterations=1000), stock)
+        with override_settings(PASSWORD_HASHING_POOL_SIZE=0):
+            self.assertEqual(PooledPBKDF2PasswordHasher().encode('Secret#123', 'somesalt', iterations=1000), stock)
+        self.assertTrue(check_password('Secret#123', stock))
+
+
+class LoginRateLimitTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+
+    @override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+        'login_ip': '100/min', 'login_email': '2/min'}))
+    def test_login_is_limited_per_email(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/login/', {'email': self.user.email, 'password': 'wrong'}).status_code, 401)
+        response = self.client.post('/api/login/', {'email': self.user.email.upper(), 'password': 'Secret#123'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Other accounts are not affected.
+        self.assertEqual(self.client.post('/api/login/', {'email': 'other@example.com', 'password': 'x'}).status_code, 401)
+
+    @override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+        'forgot_password_ip': '2/min', 'forgot_password_email': '100/min'}))
+    def test_forgot_password_is_limited_per_ip(self):
+        for email in ('a@example.com', 'b@example.com'):
+            self.client.post('/forgot-password/', {'email': email})
+        self.assertEqual(self.client.post('/forgot-password/', {'email': 'c@example.com'}).status_code, 429)
+        self.assertEqual(self.client.post('/forgot-password/', {'email': 'c@example.com'},
+                                          REMOTE_ADDR='10.0.0.2').status_code, 400)
+
+    # X-Forwarded-For is set by the client, changing it must not give a fresh bucket.
+    @override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+        'login_ip': '2/min', 'login_email': '100/min'}))
+    def test_spoofed_forwarded_for_shares_the_ip_bucket(self):
+        statuses = [self.client.post('/api/login/', {'email': self.user.email, 'password': 'wrong'},
+                                     HTTP_X_FORWARDED_FOR=f'203.0.113.{number}').status_code for number in range(3)]
+        self.assertEqual(statuses, [401, 401, 429])
+
+    # The proxy appends the address it saw, anything before it is the client's own.
+    @override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, NUM_PROXIES=1, DEFAULT_THROTTLE_RATES={
+        'login_ip': '1/min', 'login_email': '100/min'}))
+    def test_forwarded_for_is_used_behind_a_proxy(self):
+        for address in ('203.0.113.1', '203.0.113.2'):
+            response = self.client.post('/api/login/', {'email': self.user.email, 'password': 'wrong'},
+                                        HTTP_X_FORWARDED_FOR=f'198.51.100.7, {address}')
+            self.assertEqual(response.status_code, 401)
+
+    def test_token_bucket_refills(self):
+        store = TokenBucketStore(max_keys=10)
+        self.assertEqual(store.consume('key', 1, 1000), (True, 0))
+        allowed, wait = store.consume('key', 1, 1000)
+        self.assertFalse(allowed)
+        self.assertLessEqual(wait, 0.001)
+        time.sleep(0.002)
+        self.assertTrue(store.consume('key', 1, 1000)[0])
+
+
+class IncidentExportTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.incidents = [
+            self.create_incident(self.user, incident_details='Line one\nwith "quotes", commas'),
+            self.create_incident(self.user, status='Closed'),
+        ]
+        self.create_incident(self.create_user('other@example.com'))
+
+    def test_csv_export_streams_reporters_incidents(self):
+        response = self.client.get('/api/incidents/export/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['incident_id'] for row in rows], [incident.incident_id for incident in self.incidents])
+        self.assertEqual(rows[0]['incident_details'], 'Line one\nwith "quotes", commas')
+
+    def test_ndjson_export_matches_api_representation(self):
+        response = self.client.get('/api/incidents/export/', {'output': 'ndjson', 'status': 'Closed'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        detail = self.client.get(f'/api/incidents/{self.incidents[1].pk}/').data['data']
+        for field, value in rows[0].items():
+            self.assertEqual(value, detail[field])
+
+    def test_invalid_output_is_rejected(self):
+        self.assertEqual(self.client.get('/api/incidents/export/', {'output': 'xml'}).status_code, 400)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        expected = await sync_to_async(lambda: b''.join(self.client.get('/api/incidents/export/').streaming_content))()
+        # A sync stream would be buffered whole by the ASGI handler, with a warning.
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = await self.async_client.get('/api/incidents/export/', headers=headers)
+            self.assertTrue(response.is_async)
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(content, expected)
+
+
+class IncidentStatsTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+
+    def get_stats(self, **params):
+        response = self.client.get('/api/incidents/stats/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_counts_follow_creates_edits_and_deletes(self):
+        incident = self.create_incident(self.user)
+        self.create_incident(self.user, priority='Low', organization_type='Government')
+        self.create_incident(self.create_user('other@example.com'))
+        self.client.put(f'/api/incidents/{incident.pk}/', {'status': 'Closed'}, format='json')
+
+        data = self.get_stats()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['status'], {'Open': 1, 'In progress': 0, 'Closed': 1})
+        self.assertEqual(data['priority'], {'High': 1, 'Medium': 0, 'Low': 1})
+        self.assertEqual(data['organization_type']['Government'], 1)
+
+        Incident.objects.get(pk=incident.pk).delete()
+        self.assertEqual(self.get_stats()['status']['Closed'], 0)
+        self.assertEqual(check_stats_drift(), {})
+
+    def test_bulk_create_and_deferred_save_keep_counts(self):
+        self.client.post('/api/incidents/bulk/', [
+            {'organization_type': 'Enterprise', 'incident_details': 'Bulk', 'priority': 'Low'},
+        ] * 3, format='json')
+        incident = Incident.objects.only('id', 'incident_details').first()
+        incident.status = 'In progress'
+        incident.save()
+        self.assertEqual(self.get_stats()['status'], {'Open': 2, 'In progress': 1, 'Closed': 0})
+        self.assertEqual(check_stats_drift(), {})
+
+    def test_save_after_refresh_keeps_counts(self):
+        incident = self.create_incident(self.user)
+        Incident.objects.get(pk=incident.pk).update_if_unchanged({'status': 'In progress'}, incident.version)
+        incident.refresh_from_db()
+        incident.priority = 'Low'
+        incident.save()
+        self.assertEqual(self.get_stats()['status'], {'Open': 0, 'In progress': 1, 'Closed': 0})
+        self.assertEqual(check_stats_drift(), {})
+
+    def test_stale_save_moves_the_stored_count(self):
+        incident = self.create_incident(self.user)
+        stale = Incident.objects.get(pk=incident.pk)
+        incident.update_if_unchanged({'status': 'In progress'}, incident.version)
+        # The stale instance overwrites the row with its old status and a new priority.
+        stale.priority = 'Low'
+        stale.save()
+        self.assertEqual(self.get_stats()['status'], {'Open': 1, 'In progress': 0, 'Closed': 0})
+        self.assertEqual(self.get_stats()['priority'], {'High': 0, 'Medium': 0, 'Low': 1})
+        self.assertEqual(check_stats_drift(), {})
+
+    def test_stats_read_summary_rows(self):
+        for _ in range(20):
+            self.create_incident(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_stats()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"incident_incident"', queries[0]['sql'])
+
+    def test_day_filters(self):
+        incident = self.create_incident(self.user)
+        Incident.objects.filter(pk=incident.pk).update(reported_at=timezone.now() - timedelta(days=10))
+        call_command('rebuild_incident_stats', stdout=StringIO())
+        self.create_incident(self.user)
+        after = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.get_stats(reported_after=after)['total'], 1)
+        self.assertEqual(self.get_stats(reported_before=after)['total'], 1)
+        self.assertEqual(self.client.get('/api/incidents/stats/', {'reported_after': 'soon'}).status_code, 400)
+
+    def test_rebuild_command_reports_and_fixes_drift(self):
+        self.create_incident(self.user)
+        IncidentDailyStat.objects.update(count=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_incident_stats', '--check', stdout=StringIO())
+        call_command('rebuild_incident_stats', stdout=StringIO())
+        call_command('rebuild_incident_stats', '--check', stdout=StringIO())
+        self.assertEqual(self.get_stats()['total'], 1)
+
+    def test_rebuild_counts_inside_its_transaction(self):
+        self.create_incident(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            rebuild_stats()
+        # The snapshot and the replacement share one transaction (a savepoint under TestCase).
+        self.assertTrue(queries[0]['sql'].startswith('SAVEPOINT'))
+        self.assertTrue(queries[-1]['sql'].startswith('RELEASE SAVEPOINT'))
+        self.assertEqual(check_stats_drift(), {})
+
+
+# A second SQLite file stands in for the read replica, "replication" copies the
+# primary into it with SQLite's backup API.
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(IncidentTestMixin, APITransactionTestCase):
+    # The alias is registered after the test runner set up its databases, the
+    # replica is never created, flushed or checked by it.
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        configured = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3')},
+        })
+        connections.settings['replica'] = configured['replica']
+        cls.databases = cls.databases | {'replica'}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+        cls.databases = cls.databases - {'replica'}
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.incident = self.create_incident(self.user)
+        self.replicate()
+
+    def replicate(self):
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections['replica'].connection)
+
+    def test_incident_reads_use_replica(self):
+        Incident.objects.using('replica').filter(pk=self.incident.pk).update(incident_details='From replica')
+        self.assertEqual(self.client.get('/api/incident/').data['data'][0]['incident_details'], 'From replica')
+
+    # Cache misses are filled from the primary, a lagging replica would put the
+    # pre-write row back into the shared cache right after the write cleared it.
+    def test_cache_is_not_filled_from_replica(self):
+        self.client.put(f'/api/incidents/{self.incident.pk}/', {'incident_details': 'Edited'}, format='json')
+        response = self.client.get(f'/api/incidents/{self.incident.pk}/')
+        self.assertEqual(response.data['data']['incident_details'], 'Edited')
+        self.assertEqual(response['ETag'], self.client.get(f'/api/incidents/{self.incident.pk}/')['ETag'])
+        response = self.client.get('/api/incidents/search/', {'incident_id': self.incident.incident_id})
+        self.assertEqual(response.data['data']['incident_details'], 'Edited')
+        self.assertEqual(Incident.objects.using('replica').get(pk=self.incident.pk).incident_details, 'Server is down')
+
+    def test_writes_and_other_reads_use_primary(self):
+        response = self.client.put(f'/api/incidents/{self.incident.pk}/', {'incident_details': 'Edited'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Incident.objects.get(pk=self.incident.pk).incident_details, 'Edited')
+        self.assertEqual(Incident.objects.using('replica').get(pk=self.incident.pk).incident_details, 'Server is down')
+
+        with read_from_replica():
+            incident = Incident.objects.get(pk=self.incident.pk)
+        self.assertEqual(incident._state.db, 'replica')
+        self.assertEqual(ReplicaRouter().db_for_write(Incident, instance=incident), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_use_default(self):
+        with read_from_replica():
+            self.assertIsNone(ReplicaRouter().db_for_read(Incident))
+
+
+class SQLitePerformanceModeTests(TestCase):
+    def open_file_database(self, directory):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        configured = connections.configure_settings({
+            'default': connections.settings['default'],
+            'performance': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(directory, 'db.sqlite3')},
+        })
+        database = DatabaseWrapper(configured['performance'], alias='performance')
+        self.addCleanup(database.close)
+        return database
+
+    def pragma(self, database, name):
+        with database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PERFORMANCE_MODE=True, SQLITE_BUSY_TIMEOUT_MS=1234)
+    def test_pragmas_applied_on_new_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = self.open_file_database(directory)
+            self.assertEqual(self.pragma(database, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(database, 'synchronous'), 1)
+            self.assertEqual(self.pragma(database, 'busy_timeout'), 1234)
+            self.assertEqual(self.pragma(database, 'cache_size'), -settings.SQLITE_CACHE_SIZE_KB)
+
+    def test_default_mode_leaves_sqlite_defaults(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(self.pragma(self.open_file_database(directory), 'journal_mode'), 'delete')
+
+    def test_write_queue_serializes_in_arrival_order(self):
+        queue = WriteQueue()
+        order = []
+        queue.acquire()
+        queue.acquire()  # reentrant for the owning thread
+
+        def writer(name):
+            with queue:
+                order.append(name)
+
+        threads = []
+        for name in ('first', 'second'):
+            threads.append(threading.Thread(target=writer, args=(name,)))
+            threads[-1].start()
+            time.sleep(0.05)
+        queue.release()
+        time.sleep(0.05)
+        self.assertEqual(order, [])
+        queue.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['first', 'second'])
+
+
+class FastReadPathTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.create_incident(self.user, incident_details='Ünïcode \u2028 "quoted"')
+        self.create_incident(self.user, status='Closed', priority='Low')
+
+    def test_values_serializer_matches_view_serializer(self):
+        incidents = Incident.objects.order_by('id')
+        for fields in (None, ['incident_id', 'status'], ['reported_at']):
+            expected = ViewIncidentSerializer(incidents, many=True, fields=fields).data
+            rows = incidents.values(*IncidentValuesSerializer.columns(fields))
+            self.assertEqual(IncidentValuesSerializer(rows, many=True, fields=fields).data, expected)
+
+    def test_renderer_output_is_identical(self):
+        data = {
+            'data': ViewIncidentSerializer(Incident.objects.order_by('id'), many=True).data,
+            'when': timezone.now(),
+            'amount': Decimal('1.50'),
+            1: [None, True, 2.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with mock.patch('incident.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_formats_floats_like_drf(self):
+        for data in [{'big': 1e16, 'small': 0.00001}, [[1.0, {0.5: 'key'}]], {'amount': Decimal('1E+16')}]:
+            with self.subTest(data=data), override_settings(REST_FRAMEWORK={'COERCE_DECIMAL_TO_STRING': False}):
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_rejects_non_finite_floats(self):
+        for value in (float('nan'), float('inf'), -float('inf')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({'data': [value]})
+
+    def test_list_endpoint_uses_values_rows(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/incident/', {'fields': 'incident_id,status', 'page_size': 1})
+        self.assertEqual(list(response.data['data'][0]), ['incident_id', 'status'])
+        self.assertIsNotNone(response.data['next_cursor'])
+        self.assertEqual(len(self.client.get('/api/incident/', {'cursor': response.data['next_cursor']}).data['data']), 1)
+
+
+class IncidentEventBrokerTests(TestCase):
+    def test_publish_reaches_reporters_subscribers(self):
+        broker = InProcessBroker(log_size=10)
+        received = []
+        broker.subscribe(1, received.append)
+        broker.subscribe(2, lambda event: self.fail("Event of another reporter"))
+        event = broker.publish(1, 'incident.created', {'id': 5})
+        self.assertEqual(received, [event])
+        self.assertEqual(event.encode(), 'id: 1\nevent: incident.created\ndata: {"id": 5}\n\n')
+        broker.unsubscribe(1, received.append)
+        broker.publish(1, 'incident.updated', {'id': 5})
+        self.assertEqual(len(received), 1)
+
+    def test_history_detects_gaps(self):
+        broker = InProcessBroker(log_size=3)
+        for number in range(5):
+            broker.publish(number % 2, 'incident.updated', {'id': number})
+        self.assertEqual([event.id for event in broker.history(0, 3)], [5])
+        self.assertEqual(broker.history(1, 4), [])
+        self.assertIsNone(broker.history(0, 1))
+        self.assertIsNone(broker.history(0, 9))
+
+
+class IncidentEventStreamTests(IncidentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def open_stream(self, **headers):
+        response = await self.async_client.get('/api/incidents/events/', headers=dict(self.headers, **headers))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry: '))
+        return stream
+
+    async def next_event(self, stream):
+        lines = (await asyncio.wait_for(anext(stream), 5)).decode().splitlines()
+        fields = dict(line.split(': ', 1) for line in lines if line)
+        return int(fields['id']), fields['event'], json.loads(fields['data'])
+
+    # Writes run in the test's sync thread, and their on_commit callbacks with them.
+    def committed(self, write, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return write(*args, **kwargs)
+
+    async def test_streams_created_and_updated_incidents(self):
+        stream = await self.open_stream()
+        other = await sync_to_async(self.create_user)('other@example.com')
+        await sync_to_async(self.committed)(self.create_incident, other)
+        incident = await sync_to_async(self.committed)(self.create_incident, self.user)
+        _, event, data = await self.next_event(stream)
+        self.assertEqual((event, data['incident_id'], data['status']), ('incident.created', incident.incident_id, 'Open'))
+
+        sync_client = APIClient()
+        sync_client.force_authenticate(self.user)
+        await sync_to_async(self.committed)(sync_client.put, f'/api/incidents/{incident.pk}/', {'status': 'Closed'}, format='json')
+        _, event, data = await self.next_event(stream)
+        self.assertEqual((event, data['status'], data['version']), ('incident.updated', 'Closed', 2))
+        await stream.aclose()
+
+    async def test_resume_with_last_event_id(self):
+        broker = get_broker()
+        first = broker.publish(self.user.pk, 'incident.created', {'id': 1})
+        second = broker.publish(self.user.pk, 'incident.updated', {'id': 1})
+        stream = await self.open_stream(Last_Event_ID=str(first.id))
+        self.assertEqual(await self.next_event(stream), (second.id, 'incident.updated', {'id': 1}))
+        await stream.aclose()
+
+        stream = await self.open_stream(Last_Event_ID='999')
+        self.assertEqual(await self.next_event(stream), (second.id, 'reset', {}))
+        await stream.aclose()
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get('/api/incidents/events/')
+        self.assertEqual(response.status_code, 401)
+
+
+class OptimisticConcurrencyTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.incident = self.create_incident(self.user)
+        self.url = f'/api/incidents/{self.incident.pk}/'
+
+    def test_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.put(self.url, {'priority': 'Low'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.put(self.url, {'priority': 'Medium'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Incident.objects.get(pk=self.incident.pk).priority, 'Low')
+
+    def test_single_update_of_changed_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, {'priority': 'Low', 'incident_details': 'Server is down'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "incident_incident"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"priority"', updates[0])
+        self.assertNotIn('"incident_details"', updates[0])
+        self.assertIn('"version" = ', updates[0].split('WHERE')[1])
+
+    def test_conflicting_writes_are_rejected(self):
+        first, second = Incident.objects.get(pk=self.incident.pk), Incident.objects.get(pk=self.incident.pk)
+        self.assertTrue(first.update_if_unchanged({'status': 'Closed'}, first.version))
+        self.assertFalse(second.update_if_unchanged({'priority': 'Low'}, second.version))
+        incident = Incident.objects.get(pk=self.incident.pk)
+        self.assertEqual((incident.status, incident.priority, incident.version), ('Closed', 'High', 2))
+
+    def test_edit_racing_a_close_returns_conflict(self):
+        update_if_unchanged = Incident.update_if_unchanged
+
+        def close_first(incident, changes, expected_version):
+            Incident.objects.filter(pk=incident.pk).update(status='Closed')
+            return update_if_unchanged(incident, changes, expected_version)
+
+        with mock.patch.object(Incident, 'update_if_unchanged', close_first):
+            response = self.client.put(self.url, {'priority': 'Low'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Incident.objects.get(pk=self.incident.pk).priority, 'High')
+
+
+class ConcurrentEditStressTests(IncidentTestMixin, APITransactionTestCase):
+    writers = 4
+    edits_per_writer = 5
+
+    # Every writer appends its own tokens with read-modify-write cycles, retrying
+    # on 409/412 and when SQLite reports the table as locked. A lost update would
+    # drop a token from incident_details.
+    def test_no_lost_updates(self):
+        user = self.create_user()
+        incident = self.create_incident(user, incident_details='log:')
+        url = f'/api/incidents/{incident.pk}/'
+        errors = []
+
+        def writer(number):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                for edit in range(self.edits_per_writer):
+                    token = f'{number}.{edit}'
+                    while True:
+                        try:
+                            response = client.get(url)
+                            details = response.data['data']['incident_details']
+                            # The shared-cache test database can report a lock on a write that went through.
+                            if token in details.split():
+                                break
+                            response = client.put(url, {'incident_details': f'{details} {token}'}, format='json',
+                                                  HTTP_IF_MATCH=response['ETag'])
+                        except DatabaseError:
+                            continue
+                        if response.status_code == 201:
+                            break
+                        if response.status_code not in (409, 412):
+                            errors.append(response.status_code)
+                            return
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        incident.refresh_from_db()
+        tokens = incident.incident_details.split()[1:]
+        expected = {f'{number}.{edit}' for number in range(self.writers) for edit in range(self.edits_per_writer)}
+        self.assertEqual(sorted(tokens), sorted(expected))
+        self.assertEqual(incident.version, 1 + len(expected))
+
+
+class IncidentAdminTests(IncidentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Secret#123')
+        self.client.force_login(self.admin)
+        self.url = '/admin/incident/incident/'
+
+    def create_reporters(self, count, start=0):
+        for number in range(start, start + count):
+            user = self.create_user(f'reporter{number}@example.com')
+            Profile.objects.create(user=user, user_type='Individual', address='1 Main Street', country='India',
+                                   state='Kerala', city='Kochi', pincode='682001', isd_code='+91', mobile_number='9876543210')
+            self.create_incident(user)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    # The reporter/user is joined into the page query, so more rows don't mean more queries.
+    def test_changelist_query_count_is_constant(self):
+        self.create_reporters(2)
+        urls = [self.url, self.url + '?status__exact=Open&priority__exact=High', '/admin/incident/profile/']
+        few = [self.changelist_queries(url) for url in urls]
+        self.create_reporters(20, start=2)
+        self.assertEqual([self.changelist_queries(url) for url in urls], few)
+
+    def test_bulk_actions_run_one_update(self):
+        reporter = self.create_user()
+        incidents = [self.create_incident(reporter) for _ in range(3)]
+        closed = self.create_incident(reporter, status='Closed')
+        selected = [incident.pk for incident in incidents] + [closed.pk]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'action': 'close_incidents', '_selected_action': selected})
+        self.assertEqual(response.status_code, 302)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "incident_incident"')]
+        self.assertEqual(len(updates), 1)
+        for incident in incidents:
+            incident.refresh_from_db()
+            self.assertEqual((incident.status, incident.version), ('Closed', 2))
+        closed.refresh_from_db()
+        self.assertEqual(closed.version, 1)
+        self.assertEqual(check_stats_drift(), {})
+
+        self.client.post(self.url, {'action': 'set_priority_low', '_selected_action': selected})
+        self.assertFalse(Incident.objects.filter(priority='Low').exists())
+
+    # No incident is loaded and the queries don't grow with the selection.
+    def test_bulk_action_queries_do_not_grow_with_selection(self):
+        reporter = self.create_user()
+
+        def close_all():
+            selected = Incident.objects.first().pk
+            with CaptureQueriesContext(connection) as queries, \
+                    mock.patch.object(Incident, 'from_db', side_effect=AssertionError("Incident loaded")):
+                self.client.post(self.url, {'action': 'close_incidents', 'select_across': '1', 'index': '0',
+                                            '_selected_action': [selected]})
+            return len(queries)
+
+        for _ in range(3):
+            self.create_incident(reporter)
+        few = close_all()
+        for _ in range(30):
+            self.create_incident(reporter, priority='Low')
+        self.assertEqual(close_all(), few)
+        self.assertFalse(Incident.objects.exclude(status='Closed').exists())
+        self.assertEqual(check_stats_drift(), {})
+
+    def test_bulk_action_publishes_updated_events(self):
+        reporter = self.create_user()
+        incidents = [self.create_incident(reporter) for _ in range(2)]
+        received = []
+        get_broker().subscribe(reporter.pk, received.append)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'action': 'set_priority_low', '_selected_action': [incident.pk for incident in incidents]})
+        self.assertEqual(sorted((event.type, event.data['id'], event.data['priority'], event.data['version']) for event in received),
+                         [('incident.updated', incident.pk, 'Low', 2) for incident in incidents])
+
+    def test_bulk_action_invalidates_cached_incidents(self):
+        reporter = self.create_user()
+        incident = self.create_incident(reporter)
+        self.client.force_login(self.admin)
+        api = APIClient()
+        api.force_authenticate(reporter)
+        self.assertEqual(api.get(f'/api/incidents/{incident.pk}/').data['data']['priority'], 'High')
+        self.client.post(self.url, {'action': 'set_priority_low', '_selected_action': [incident.pk]})
+        self.assertEqual(api.get(f'/api/incidents/{incident.pk}/').data['data']['priority'], 'Low')
+
+    def test_delete_selected_keeps_stats_and_cache_in_step(self):
+        reporter = self.create_user()
+        incidents = [self.create_incident(reporter) for _ in range(2)]
+        kept = self.create_incident(reporter)
+        api = APIClient()
+        api.force_authenticate(reporter)
+        self.assertEqual(api.get(f'/api/incidents/{incidents[0].pk}/').status_code, 200)
+
+        response = self.client.post(self.url, {'action': 'delete_selected', 'post': 'yes',
+                                               '_selected_action': [incident.pk for incident in incidents]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Incident.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(check_stats_drift(), {})
+        self.assertEqual(api.get(f'/api/incidents/{incidents[0].pk}/').status_code, 404)
+
+    def test_paginator_uses_estimate_for_large_results(self):
+        self.create_reporters(2)
+        with mock.patch('incident.pagination.estimate_count', return_value=2_500_000):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count, 2_500_000)
+        self.assertEqual(self.client.get(self.url).context['cl'].result_count, 2)
+
+
+class IncidentArchiveTests(IncidentTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        old = timezone.now() - timedelta(days=200)
+        # Oldest first: two old closed ones to archive, an old open one and a recently closed one to keep.
+        self.archived = [self.create_incident(self.user, status='Closed', reported_at=old + timedelta(hours=hour)) for hour in range(2)]
+        self.open = self.create_incident(self.user, reported_at=old + timedelta(hours=2))
+        self.recent = self.create_incident(self.user, status='Closed', reported_at=old + timedelta(hours=3))
+        Incident.objects.filter(pk__in=[incident.pk for incident in self.archived + [self.open]]).update(updated_at=old)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_incidents', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_old_closed_incidents_in_resumable_batches(self):
+        self.assertIn('2 incident(s)', self.archive('--dry-run'))
+        self.archive('--batch-size', '1', '--max-batches', '1')
+        self.assertEqual(list(ArchivedIncident.objects.values_list('pk', flat=True)), [self.archived[0].pk])
+        self.assertIn('1 incident(s) archived', self.archive('--batch-size', '1'))
+        self.assertEqual(sorted(ArchivedIncident.objects.values_list('pk', flat=True)), [incident.pk for incident in self.archived])
+        self.assertEqual(sorted(Incident.objects.values_list('pk', flat=True)), [self.open.pk, self.recent.pk])
+        self.assertEqual(check_stats_drift(), {})
+
+    def test_reads_see_archived_incidents(self):
+        before = {
+            'detail': self.client.get(f'/api/incidents/{self.archived[0].pk}/').data,
+            'by_id': self.client.get('/api/incidents/search/', {'incident_id': self.archived[1].incident_id}).data,
+            'list': self.client.get('/api/incident/', {'ordering': 'reported_at'}).data,
+        }
+        cache.clear()
+        self.archive()
+        self.assertEqual(self.client.get(f'/api/incidents/{self.archived[0].pk}/').data, before['detail'])
+        self.assertEqual(self.client.get('/api/incidents/search/', {'incident_id': self.archived[1].incident_id}).data, before['by_id'])
+        self.assertEqual(self.client.get('/api/incident/', {'ordering': 'reported_at'}).data, before['list'])
+        self.assertEqual(self.client.get('/api/incidents/stats/').data['data']['status']['Closed'], 3)
+
+    def test_export_and_search_see_archived_incidents(self):
+        def export():
+            response = self.client.get('/api/incidents/export/', {'output': 'csv'})
+            return b''.join(response.streaming_content).decode()
+
+        def search():
+            return [row['id'] for row in self.client.get('/api/incidents/search/', {'q': 'server'}).data['data']]
+
+        before = {'export': export(), 'search': sorted(search())}
+        self.archive()
+        self.assertEqual(export(), before['export'])
+        self.assertEqual(sorted(search()), before['search'])
+        self.assertEqual(len(search()), 4)
+
+    # Archived ids from the old random generator must not be handed out again.
+    def test_archived_ids_are_not_allocated_again(self):
+        Incident.objects.filter(pk=self.archived[0].pk).update(incident_id='RMG100002030')
+        self.archive()
+        self.assertTrue(ArchivedIncident.objects.filter(incident_id='RMG100002030').exists())
+        self.assertEqual(IncidentIdAllocator(block_size=2).allocate_many(2, year=2030), ['RMG100012030', 'RMG100022030'])
+
+    def test_list_pages_across_both_tables(self):
+        self.archive()
+        pages, params = [], {'page_size': 1}
+        while True:
+            response = self.client.get('/api/incident/', params)
+            pages.append(response.data['data'][0]['id'])
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        self.assertEqual(pages, [self.recent.pk, self.open.pk, self.archived[1].pk, self.archived[0].pk])
+
+    def test_open_incident_lists_skip_the_archive(self):
+        self.archive()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/incident/', {'status': 'Open'})
+        self.assertEqual([row['id'] for row in response.data['data']], [self.open.pk])
+        self.assertFalse([query for query in queries if 'incident_archivedincident' in query['sql']])
+
+    def test_archived_incidents_cannot_be_edited(self):
+        self.archive()
+        response = self.client.put(f'/api/incidents/{self.archived[0].pk}/', {'priority': 'Low'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_async_views_see_archived_incidents(self):
+        await sync_to_async(self.archive)()
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = await self.async_client.get(f'/api/async/incidents/{self.archived[0].pk}/', headers=headers)
+        self.assertEqual(response.json()['data']['incident_id'], self.archived[0].incident_id)
+        response = await self.async_client.get('/api/async/incident/', headers=headers)
+        self.assertEqual(len(response.json()['data']), 4)
+
+
+class PincodeIndexTests(IncidentTestMixin, APITestCase):
+    csv = (
+        "officename,pincode,Districtname,statename\n"
+        "MG Road S.O,560001,Bengaluru,Karnataka\n"
+        "Vidhana Soudha S.O,560001,Bengaluru Urban,Karnataka\n"
+        "Kochi H.O,682001,Ernakulam,Kerala\n"
+        "Connaught Place S.O,110001,New Delhi,Delhi\n"
+    )
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, 'pincodes.csv')
+        with open(self.source, 'w') as file:
+            file.write(self.csv)
+        self.path = os.path.join(directory.name, 'pincodes.idx')
+        settings_override = override_settings(PINCODE_INDEX_PATH=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('build_pincode_index', self.source, stdout=StringIO())
+
+    def test_lookup(self):
+        index = PincodeIndex(self.path)
+        self.addCleanup(index.close)
+        self.assertEqual(index.size, 3)
+        # The first post office of a pincode wins.
+        self.assertEqual(index.lookup(' 560 001'), {'pincode': '560001', 'city': 'Bengaluru', 'state': 'Karnataka', 'country': 'India'})
+        self.assertEqual(index.lookup('110001')['state'], 'Delhi')
+        for code in ['000000', '999999', '56000', '', 'x' * 20]:
+            self.assertIsNone(index.lookup(code))
+
+    def test_lookup_endpoint(self):
+        response = self.client.get('/api/pincode/682001/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['city'], 'Ernakulam')
+        self.assertEqual(self.client.get('/api/pincode/123456/').status_code, 404)
+        with override_settings(PINCODE_INDEX_PATH=self.path + '.missing'):
+            self.assertEqual(self.client.get('/api/pincode/682001/').status_code, 503)
+
+    def test_registration_fills_location_from_pincode(self):
+        registration = dict(AccountQueryCountTests.registration)
+        profile = {key: value for key, value in registration['profile'].items() if key not in ('country', 'state', 'city')}
+        response = self.client.post('/api/register/', dict(registration, profile=dict(profile, city='Bangalore')), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Profile.objects.values_list('city', 'state', 'country').get(), ('Bangalore', 'Karnataka', 'India'))
+
+        response = self.client.post('/api/register/', dict(registration, email='ravi@example.com', profile=dict(profile, pincode='123456')), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['profile']), {'country', 'state', 'city'})
+
+    def test_command_rejects_unknown_columns(self):
+        with self.assertRaises(CommandError):
+            call_command('build_pincode_index', self.source, '--pincode-column', 'zip', stdout=StringIO())
+
+    def test_command_rejects_short_rows(self):
+        with open(self.source, 'a') as file:
+            file.write("Kozhikode H.O,673001,Kozhikode\n")
+        with self.assertRaisesMessage(CommandError, "Line 6 has fewer fields"):
+            call_command('build_pincode_index', self.source, stdout=StringIO())
+        # The index built in setUp is left as it was.
+        index = PincodeIndex(self.path)
+        self.addCleanup(index.close)
+        self.assertEqual(index.size, 3)
+
+
+class SeedIncidentsTests(TestCase):
+    def test_command_seeds_users_and_incidents(self):
+        call_command('seed_incidents', '--users', '20', '--incidents', '2000', '--batch-size', '500', '--seed', '1', stdout=StringIO())
+        self.assertEqual(Profile.objects.filter(user__username__startswith='seed-').count(), 20)
+        self.assertEqual(Incident.objects.count(), 2000)
+        self.assertEqual(check_stats_drift(), {})
+        self.assertTrue(User.objects.get(username='seed-0@example.com').check_password(SEED_PASSWORD))
+
+        statuses = Counter(Incident.objects.values_list('status', flat=True))
+        self.assertGreater(statuses['Closed'], statuses['Open'])
+        # The busiest reporter files far more than an even share.
+        per_reporter = Counter(Incident.objects.values_list('reporter', flat=True))
+        self.assertGreater(per_reporter.most_common(1)[0][1], 3 * 2000 / 20)
+
+    def test_reruns_continue_the_id_sequence(self):
+        call_command('seed_incidents', '--users', '2', '--incidents', '10', stdout=StringIO())
+        call_command('seed_incidents', '--users', '0', '--incidents', '10', stdout=StringIO())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Incident.objects.values('incident_id').distinct().count(), 20)
+        self.assertEqual(Incident.objects.order_by('-incident_id').values_list('incident_id', flat=True).first(), 'SEED00000000019')
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+# In-memory token buckets, one per key. The number of keys is bounded so a
+# flood of distinct IPs or emails cannot grow the store without limit.
+class TokenBucketStore:
+    def __init__(self, max_keys=None):
+        self._max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    @property
+    def max_keys(self):
+        return self._max_keys or getattr(settings, 'THROTTLE_MAX_KEYS', 100000)
+
+    # Take one token from the bucket of `key`. Returns (allowed, seconds until a token is available).
+    def consume(self, key, capacity, refill_per_second):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / refill_per_second
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+bucket_store = TokenBucketStore()
+
+
+def parse_rate(rate):
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+# Token bucket throttle: `num/period` from DEFAULT_THROTTLE_RATES[scope] is both
+# the burst size and the refill rate.
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        key = self.get_cache_key(request, view)
+        if rate is None or key is None:
+            return True
+        num, duration = parse_rate(rate)
+        allowed, self._wait = bucket_store.consume(f'{self.scope}:{key}', num, num / duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+# Keyed by the email in the request body, so one account can't be hammered from many IPs.
+class EmailThrottle(TokenBucketThrottle):
+    def get_cache_key(self, request, view):
+        data = getattr(request, 'data', None)
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return email.strip().lower()
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class ForgotPasswordIPThrottle(IPThrottle):
+    scope = 'forgot_password_ip'
+
+
+class ForgotPasswordEmailThrottle(EmailThrottle):
+    scope = 'forgot_password_email'
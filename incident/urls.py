@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path
-from .views import RegisterAPIView, LoginAPIView, IncidentView, RetrieveIncidentByIdView, ForgotPasswordAPIView, ResetPasswordAPIView
+from .async_views import AsyncIncidentView, AsyncLoginView, AsyncRetrieveIncidentByIdView, IncidentEventStreamView
+from .views import RegisterAPIView, LoginAPIView, IncidentView, BulkIncidentView, ExportIncidentView, RetrieveIncidentByIdView, IncidentCacheStatsView, IncidentStatsView, PincodeLookupView, MetricsView, ForgotPasswordAPIView, ResetPasswordAPIView
 
 urlpatterns = [
     # API view
@@ -8,7 +9,19 @@ urlpatterns = [
     path('api/login/', LoginAPIView.as_view(), name='login'),
     path('api/incident/', IncidentView.as_view(), name='login'),
     path('api/incidents/<int:pk>/', IncidentView.as_view(), name='incident-detail'),
+    path('api/incidents/bulk/', BulkIncidentView.as_view(), name='incident-bulk'),
+    path('api/incidents/export/', ExportIncidentView.as_view(), name='incident-export'),
     path('api/incidents/search/', RetrieveIncidentByIdView.as_view(), name='incident-search'),
+    path('api/incidents/stats/', IncidentStatsView.as_view(), name='incident-stats'),
+    path('api/incidents/cache/stats/', IncidentCacheStatsView.as_view(), name='incident-cache-stats'),
+    # Async (ASGI) variants of the API views above
+    path('api/async/login/', AsyncLoginView.as_view(), name='async-login'),
+    path('api/async/incident/', AsyncIncidentView.as_view(), name='async-incident'),
+    path('api/async/incidents/<int:pk>/', AsyncIncidentView.as_view(), name='async-incident-detail'),
+    path('api/async/incidents/search/', AsyncRetrieveIncidentByIdView.as_view(), name='async-incident-search'),
+    path('api/incidents/events/', IncidentEventStreamView.as_view(), name='incident-events'),
+    path('api/pincode/<str:code>/', PincodeLookupView.as_view(), name='pincode-lookup'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('forgot-password/', ForgotPasswordAPIView.as_view(), name='forgot-password'),
     path('reset-password/', ResetPasswordAPIView.as_view(), name='reset_password_api'),
 ]
@@ -1,23 +1,76 @@
 from django.shortcuts import render
+from django.http import Http404, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
 from django.conf import settings
-from .models import Incident
+from .models import ArchivedIncident, Incident
+from .pagination import IncidentCursorPaginator
+from .search import search_incidents
+from .stats import incident_stats
+from .archive import find_incident, incident_querysets, summarize
+from .routers import read_from_replica
+from .outbox import queue_email
+from .export import CONTENT_TYPES, export_response
+from .metrics import render_metrics
+from .pincodes import get_pincode_index
+from .authentication import user_cache
+from .throttling import LoginIPThrottle, LoginEmailThrottle, ForgotPasswordIPThrottle, ForgotPasswordEmailThrottle
+from .parsers import NDJSONParser
+from .cache import incident_cache
+from .conditional import make_etag, is_not_modified, if_match_satisfied, set_validators
 from django.views.decorators.csrf import csrf_exempt
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes, force_str
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.tokens import default_token_generator
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.contrib.auth.password_validation import validate_password
 from django.urls import reverse
-from .serializers import RegistrationSerializer, LoginSerializer, PasswordResetRequestSerializer, IncidentSerializer, ViewIncidentSerializer, EditIncidentSerializer, ForgotPasswordSerializer, ResetPasswordSerializer
+from django.utils.dateparse import parse_datetime
+from .serializers import RegistrationSerializer, LoginSerializer, PasswordResetRequestSerializer, IncidentSerializer, ViewIncidentSerializer, EditIncidentSerializer, IncidentValuesSerializer, ForgotPasswordSerializer, ResetPasswordSerializer
+
+# Columns of the Incident model that can be requested through `fields=`.
+INCIDENT_FIELDS = ['id', 'organization_type', 'incident_id', 'reporter', 'incident_details', 'reported_at', 'priority', 'status', 'updated_at', 'version']
+
+# Load and serialize a single incident, archived or not, None if it does not exist for this reporter.
+def load_incident(**lookup):
+    row = find_incident(IncidentValuesSerializer.columns(), **lookup)
+    return IncidentValuesSerializer(row).data if row is not None else None
+
+# Parse the `fields=` query parameter, returns None when it names an unknown field.
+def get_requested_fields(params):
+    fields = params.get('fields')
+    if not fields:
+        return []
+    fields = [name.strip() for name in fields.split(',') if name.strip()]
+    if not set(fields) <= set(INCIDENT_FIELDS):
+        return None
+    return fields
+
+# Strong ETag and Last-Modified of a single serialized incident, derived from its row version.
+def incident_validators(data):
+    last_modified = data['updated_at']
+    if isinstance(last_modified, str):
+        last_modified = parse_datetime(last_modified)
+    return make_etag(data['id'], data['version']), last_modified
+
+# Serve GET/HEAD requests of the view from a read replica (when DATABASE_REPLICAS
+# are configured). Only for views whose readers can live with replication lag.
+class ReplicaReadMixin:
+    replica_read_methods = ('GET', 'HEAD')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.replica_read_methods:
+            return super().dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
 
 # This API is for registering a new user
 class RegisterAPIView(APIView):
@@ -30,6 +83,8 @@ class RegisterAPIView(APIView):
 
 # This API is for Login.
 class LoginAPIView(APIView):
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
@@ -49,33 +104,61 @@ class LoginAPIView(APIView):
         return Response({'error': 'Invalid input', 'details': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
     
 # Api for create/update/View the Incident
-class IncidentView(APIView):
+class IncidentView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk=None, *args, **kwargs):
         if pk:
-            # Retrieve a specific incident
-            try:
-                incident = Incident.objects.get(pk=pk, reporter=request.user)
-                serializer = ViewIncidentSerializer(incident)
-                return Response({
-                    'message': 'Successfully Fetched',
-                    "status_code": 200,
-                    "data" : serializer.data
-                }, status=status.HTTP_200_OK)
-                # return Response(serializer.data)
-            except Incident.DoesNotExist:
+            # Retrieve a specific incident, served from the cache when possible
+            data = incident_cache.get_by_pk(request.user.pk, pk, lambda: load_incident(pk=pk, reporter=request.user))
+            if data is None:
                 return Response({"error": "Incident not found or you do not have permission to view this incident."},
                                 status=status.HTTP_404_NOT_FOUND)
+            etag, last_modified = incident_validators(data)
+            if is_not_modified(request, etag, last_modified):
+                return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+            return set_validators(Response({
+                'message': 'Successfully Fetched',
+                "status_code": 200,
+                "data" : data
+            }, status=status.HTTP_200_OK), etag, last_modified)
+            # return Response(serializer.data)
         else:
-            # Retrieve all incidents for the user
-            incidents = Incident.objects.filter(reporter=request.user)
-            serializer = ViewIncidentSerializer(incidents, many=True)
-            return Response({
+            # Retrieve the user's (filtered) incidents one page at a time, newest first by default
+            fields = get_requested_fields(request.query_params)
+            if fields is None:
+                return Response({"error": "Invalid fields requested. Allowed fields: " + ", ".join(INCIDENT_FIELDS) + "."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                # Hot and archived incidents, the archive is skipped when it can't match.
+                querysets = incident_querysets(request.user, request.query_params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                paginator = IncidentCursorPaginator(request)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # The list is unchanged while the row count and the newest updated_at are,
+            # so an aggregate query per table can answer a conditional GET.
+            summary = summarize(querysets)
+            etag = make_etag(request.user.pk, summary['count'], summary['last_modified'], request.get_full_path())
+            if is_not_modified(request, etag, summary['last_modified']):
+                return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, summary['last_modified'])
+
+            try:
+                # Only the requested columns (plus the cursor ones) are read, as plain rows.
+                columns = IncidentValuesSerializer.columns(fields or None)
+                page = paginator.paginate_querysets([queryset.values(*columns) for queryset in querysets])
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = IncidentValuesSerializer(page, many=True, fields=fields or None)
+            return set_validators(Response({
                     'message': 'Successfully Fetched',
                     "status_code": 200,
-                    "data" : serializer.data
-                }, status=status.HTTP_200_OK)
+                    "data" : serializer.data,
+                    "next_cursor": paginator.next_cursor,
+                }, status=status.HTTP_200_OK), etag, summary['last_modified'])
             # return Response(serializer.data)
 
     def post(self, request, *args, **kwargs):
@@ -94,63 +177,201 @@ class IncidentView(APIView):
         try:
             incident = Incident.objects.get(pk=pk, reporter=request.user)
         except Incident.DoesNotExist:
+            # Archived incidents are closed ones.
+            if ArchivedIncident.objects.filter(pk=pk, reporter=request.user).exists():
+                return Response({"message": "You cannot edit a closed incident.", "status_code": 400},
+                                status=status.HTTP_400_BAD_REQUEST)
             return Response({"message": "Incident not found or you do not have permission to update this incident.", "status_code": 400},
                             status=status.HTTP_404_NOT_FOUND)
 
+        etag, last_modified = incident_validators({'id': incident.pk, 'version': incident.version, 'updated_at': incident.updated_at})
+        if not if_match_satisfied(request, etag):
+            return set_validators(Response({"message": "The incident has changed since it was fetched, fetch it again before editing.", "status_code": 412},
+                                           status=status.HTTP_412_PRECONDITION_FAILED), etag, last_modified)
+
         serializer = EditIncidentSerializer(incident, data=request.data, partial=True)
         if serializer.is_valid():
             if incident.status == 'Closed':  # Assuming 'status' is a field on your model
                 return Response({"message": "You cannot edit a closed incident.",  "status_code": 400 },
                                 status=status.HTTP_400_BAD_REQUEST)
-            serializer.save()
-            return Response({
+            # Only the fields that actually change are written, in one conditional UPDATE.
+            changes = {name: value for name, value in serializer.validated_data.items() if getattr(incident, name) != value}
+            if changes and not incident.update_if_unchanged(changes, incident.version):
+                return Response({"message": "The incident was edited or closed by another request, fetch it again before editing.", "status_code": 409},
+                                status=status.HTTP_409_CONFLICT)
+            etag, last_modified = incident_validators({'id': incident.pk, 'version': incident.version, 'updated_at': incident.updated_at})
+            return set_validators(Response({
                     'message': 'Successfully Updated',
                     # "status_code": 200,
                     "data" : serializer.data
-                }, status=status.HTTP_201_CREATED)
+                }, status=status.HTTP_201_CREATED), etag, last_modified)
             # return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# Api for creating many Incidents at once from a JSON array or an NDJSON stream
+class BulkIncidentView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list) or not request.data:
+            return Response({"error": "Expected a non-empty list of incidents."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_size = getattr(settings, 'INCIDENT_BULK_MAX_SIZE', 1000)
+        if len(request.data) > max_size:
+            return Response({"error": f"At most {max_size} incidents can be created per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = IncidentSerializer(data=request.data, many=True, context={'request': request})
+        if serializer.is_valid():
+            incidents = serializer.save()
+            return Response({
+                    'message': 'Successfully Created',
+                    "status_code": 201,
+                    "count": len(incidents),
+                    "data": [incident.incident_id for incident in incidents],
+                }, status=status.HTTP_201_CREATED)
+        # Report the errors of each invalid item together with its position in the batch
+        errors = [{"index": index, "errors": item_errors} for index, item_errors in enumerate(serializer.errors) if item_errors]
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+# Api for exporting all of the user's Incidents as a CSV or NDJSON stream
+class ExportIncidentView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'csv')
+        if output not in CONTENT_TYPES:
+            return Response({"error": "output must be one of: " + ", ".join(CONTENT_TYPES) + "."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            querysets = incident_querysets(request.user, request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(querysets, output, chunk_size=getattr(settings, 'INCIDENT_EXPORT_CHUNK_SIZE', 2000),
+                               asynchronous=isinstance(request._request, ASGIRequest))
+
 # Api for searched the Incident that has been created before.
-class RetrieveIncidentByIdView(APIView):
+class RetrieveIncidentByIdView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
+        if 'q' in request.query_params:
+            return self.search(request)
+
         incident_id = request.query_params.get('incident_id')
         if not incident_id:
-            return Response({"error": "incident_id query parameter is required."},
+            return Response({"error": "incident_id or q query parameter is required."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            incident = Incident.objects.get(incident_id=incident_id, reporter=request.user)
-        except Incident.DoesNotExist:
+        data = incident_cache.get_by_incident_id(
+            request.user.pk, incident_id, lambda: load_incident(incident_id=incident_id, reporter=request.user))
+        if data is None:
             return Response({"error": "Incident not found or you do not have permission to view this incident."},
                             status=status.HTTP_404_NOT_FOUND)
 
-        serializer = ViewIncidentSerializer(incident)
-        return Response({
+        etag, last_modified = incident_validators(data)
+        if is_not_modified(request, etag, last_modified):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+        return set_validators(Response({
                     'message': 'Successfully item searched',
                     # "status_code": 200,
-                    "data" : serializer.data
-                }, status=status.HTTP_201_CREATED)
+                    "data" : data
+                }, status=status.HTTP_201_CREATED), etag, last_modified)
         # return Response(serializer.data)
 
+    # Full-text search over incident_details, results ranked by relevance
+    def search(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "q query parameter must not be empty."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = IncidentCursorPaginator(request).page_size
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        incidents = search_incidents(request.user, text, limit)
+        serializer = ViewIncidentSerializer(incidents, many=True)
+        return Response({
+                    'message': 'Successfully item searched',
+                    "status_code": 200,
+                    "data" : serializer.data
+                }, status=status.HTTP_200_OK)
+
+# Api for the hit/miss counters of the incident cache (admin only)
+class IncidentCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+                    'message': 'Successfully Fetched',
+                    "status_code": 200,
+                    "data": incident_cache.stats(),
+                }, status=status.HTTP_200_OK)
+
+# Api for the dashboard counts by status, priority and organization type,
+# read from the pre-aggregated IncidentDailyStat rows.
+class IncidentStatsView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            data = incident_stats(request.user, request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+                    'message': 'Successfully Fetched',
+                    "status_code": 200,
+                    "data": data,
+                }, status=status.HTTP_200_OK)
+
+# Api for the city/state/country of a pincode, used by the registration form
+# to auto-fill the address. Served from the offline index, no login needed.
+class PincodeLookupView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, code, *args, **kwargs):
+        index = get_pincode_index()
+        if index is None:
+            return Response({"error": "Pincode lookup is not available."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        location = index.lookup(code)
+        if location is None:
+            return Response({"error": "Pincode not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+                    'message': 'Successfully Fetched',
+                    "status_code": 200,
+                    "data": location,
+                }, status=status.HTTP_200_OK)
+
+# Prometheus metrics collected by PerformanceMiddleware, only served when PERF_METRICS_ENDPOINT is enabled
+class MetricsView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, *args, **kwargs):
+        if not getattr(settings, 'PERF_METRICS_ENDPOINT', False):
+            raise Http404
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Api for forgot the password (this will send the link on the email)
 class ForgotPasswordAPIView(APIView):
+    throttle_classes = [ForgotPasswordIPThrottle, ForgotPasswordEmailThrottle]
+
     def post(self, request):
         serializer = ForgotPasswordSerializer(data=request.data)
         if serializer.is_valid():
-            email = serializer.validated_data['email']
-            user = User.objects.get(email=email)
+            user = serializer.validated_data['user']
             token = default_token_generator.make_token(user)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
             reset_url = f"{request.scheme}://{request.get_host()}/reset-password/?uid={uid}&token={token}"
-            send_mail(
+            # Delivered by the send_outbox worker
+            queue_email(
                 'Password Reset Request',
                 reset_url,
                 settings.EMAIL_HOST_USER,
                 [user.email],
-                fail_silently=False,
             )
             return Response({"message": "Password reset email sent.", "status_code": 200}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -175,6 +396,7 @@ class ResetPasswordAPIView(APIView):
             if user and default_token_generator.check_token(user, token):
                 user.set_password(new_password)
                 user.save()
+                user_cache.invalidate(user.pk)
                 return Response({"message": "Password has been reset successfully.", "status_code": 200}, status=status.HTTP_200_OK)
             return Response({"error": "Invalid token or user ID."}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'incident.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,22 +81,77 @@ WSGI_APPLICATION = 'incident_management_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
+# SQLite by default. Setting DB_NAME (see .env.example) selects the PostgreSQL
+# profile: pooled connections (DB_POOL, needs psycopg 3) or persistent ones
+# (DB_CONN_MAX_AGE), and one read replica alias per host in DB_REPLICA_HOSTS.
+
+def postgres_database(host):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('DB_NAME'),
+        'USER': os.getenv('DB_USER'),
+        'PASSWORD': os.getenv('DB_PASSWORD'),
+        'HOST': host,
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if os.getenv('DB_POOL', 'True') == 'True':
+        from psycopg_pool import ConnectionPool
+        # Pooled connections are returned to the pool after each request instead of being kept open.
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 600)),
+            # Health check of a connection before it is handed out.
+            'check': ConnectionPool.check_connection,
+        }
+    return database
+
+
+# Opt-in SQLite tuning (incident.sqlite): WAL journal, synchronous=NORMAL, a
+# bigger page cache and mmap, a busy timeout, and write transactions that start
+# with BEGIN IMMEDIATE and queue up per process instead of failing when locked.
+SQLITE_PERFORMANCE_MODE = os.getenv("SQLITE_PERFORMANCE_MODE", "False") == "True"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+
+if os.getenv('DB_NAME'):
+    DATABASES = {'default': postgres_database(os.getenv('DB_HOST', 'localhost'))}
+    for index, replica_host in enumerate(host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()):
+        DATABASES[f'replica_{index}'] = dict(postgres_database(replica_host), TEST={'MIRROR': 'default'})
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_PERFORMANCE_MODE else {},
+        }
+    }
+
+# IncidentView, RetrieveIncidentByIdView and IncidentStatsView read from these
+# aliases on GET (incident.routers.ReplicaRouter), everything else uses default.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['incident.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory by default, point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) when running several workers.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': os.getenv("CACHE_LOCATION", "incident-management-system"),
     }
 }
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.getenv('DB_NAME'),
-#         'USER': os.getenv('DB_USER'),
-#         'PASSWORD': os.getenv('DB_PASSWORD'),
-#         'HOST': os.getenv('DB_HOST', 'localhost'),
-#         'PORT': os.getenv('DB_PORT', '5432'),
-#     }
-# }
+INCIDENT_CACHE_ALIAS = os.getenv("INCIDENT_CACHE_ALIAS", "default")
+INCIDENT_CACHE_TIMEOUT = int(os.getenv("INCIDENT_CACHE_TIMEOUT", 60))
 
 
 # Password validation
@@ -116,6 +172,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# PBKDF2 runs on a pool of PASSWORD_HASHING_POOL_SIZE processes (0 hashes inline).
+# Keeps the stock pbkdf2_sha256 format, so existing password hashes stay valid.
+PASSWORD_HASHERS = [
+    'incident.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASHING_POOL_SIZE = int(os.getenv("PASSWORD_HASHING_POOL_SIZE", 2))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -141,11 +208,31 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 REST_FRAMEWORK = {
+    # orjson-backed JSON rendering when orjson is installed (incident.renderers)
+    'DEFAULT_RENDERER_CLASSES': (
+        'incident.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'incident.authentication.CachedJWTAuthentication',
     ),
+    # Token bucket limits of the login and forgot-password endpoints (incident.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv("THROTTLE_LOGIN_IP", "30/min"),
+        'login_email': os.getenv("THROTTLE_LOGIN_EMAIL", "10/min"),
+        'forgot_password_ip': os.getenv("THROTTLE_FORGOT_PASSWORD_IP", "10/min"),
+        'forgot_password_email': os.getenv("THROTTLE_FORGOT_PASSWORD_EMAIL", "3/hour"),
+    },
+    # Reverse proxies in front of the app. The per-IP limits key on the address the
+    # last of them saw in X-Forwarded-For, with 0 on REMOTE_ADDR: the header is
+    # client-supplied, trusting it unconditionally would give every request a fresh bucket.
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", 0)),
 }
 
+# Users resolved from JWTs are cached in each worker for this many seconds
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", 60))
+JWT_USER_CACHE_SIZE = int(os.getenv("JWT_USER_CACHE_SIZE", 10000))
+
 
 # Fetch the variables from the environment
 DEFAULT_AUTO_FIELD = os.getenv("DEFAULT_AUTO_FIELD", "django.db.models.BigAutoField")
@@ -156,3 +243,57 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True") == "True"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
+
+# Incident list pagination
+INCIDENT_PAGE_SIZE = int(os.getenv("INCIDENT_PAGE_SIZE", 100))
+INCIDENT_MAX_PAGE_SIZE = int(os.getenv("INCIDENT_MAX_PAGE_SIZE", 1000))
+
+# Number of incident ids a worker reserves from the per-year sequence at once
+INCIDENT_ID_BLOCK_SIZE = int(os.getenv("INCIDENT_ID_BLOCK_SIZE", 50))
+
+# Maximum number of incidents accepted by one bulk ingestion request
+INCIDENT_BULK_MAX_SIZE = int(os.getenv("INCIDENT_BULK_MAX_SIZE", 1000))
+
+# Closed incidents not updated for this many days are moved to the archive table
+# by the archive_incidents command, in transactions of INCIDENT_ARCHIVE_BATCH_SIZE rows
+INCIDENT_ARCHIVE_AFTER_DAYS = int(os.getenv("INCIDENT_ARCHIVE_AFTER_DAYS", 90))
+INCIDENT_ARCHIVE_BATCH_SIZE = int(os.getenv("INCIDENT_ARCHIVE_BATCH_SIZE", 1000))
+
+# Memory-mapped pincode index used to auto-fill Profile addresses (see the build_pincode_index command)
+PINCODE_INDEX_PATH = os.getenv("PINCODE_INDEX_PATH") or str(BASE_DIR / 'data' / 'pincodes.idx')
+
+# Admin changelists show PostgreSQL's row estimate instead of an exact COUNT(*) above this many rows
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", 10000))
+
+# Outbox delivery retries (see the send_outbox management command)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 30))
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv("OUTBOX_RETRY_MAX_SECONDS", 3600))
+# A worker that dies mid-batch leaves its claimed emails to others after this long
+OUTBOX_CLAIM_SECONDS = int(os.getenv("OUTBOX_CLAIM_SECONDS", 600))
+
+# Performance instrumentation (incident.middleware.PerformanceMiddleware)
+PERF_METRICS_ENDPOINT = os.getenv("PERF_METRICS_ENDPOINT", "False") == "True"
+PERF_SLOW_QUERY_MS = float(os.getenv("PERF_SLOW_QUERY_MS", 100))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'incident.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Rows fetched per database round trip (and per streamed chunk) by the incident export
+INCIDENT_EXPORT_CHUNK_SIZE = int(os.getenv("INCIDENT_EXPORT_CHUNK_SIZE", 2000))
+
+# Incident change events (api/incidents/events/, ASGI only). The in-process
+# broker reaches the streams of its own worker and keeps the last
+# INCIDENT_EVENT_LOG_SIZE events for Last-Event-ID resume.
+INCIDENT_EVENT_BROKER = os.getenv("INCIDENT_EVENT_BROKER", "incident.events.InProcessBroker")
+INCIDENT_EVENT_LOG_SIZE = int(os.getenv("INCIDENT_EVENT_LOG_SIZE", 1000))
+INCIDENT_EVENT_QUEUE_SIZE = int(os.getenv("INCIDENT_EVENT_QUEUE_SIZE", 100))
+INCIDENT_EVENT_HEARTBEAT = float(os.getenv("INCIDENT_EVENT_HEARTBEAT", 15))